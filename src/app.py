@@ -5,12 +5,19 @@
 - HTTP request, response and error handling
 """
 
+import functools
+import hashlib
+import itertools
+import json
 import os
 
+import numpy as np
 from flask import Flask, abort, render_template, request
 
 import material
 import plots
+import precomputed
+import transport
 from material import symmetries
 
 app = Flask("elasticas")
@@ -18,6 +25,10 @@ app = Flask("elasticas")
 # The following hack makes the application work in pythonanywhere
 app.root_path = os.path.dirname(os.path.abspath(__file__))
 
+# Outputs and maximum number of materials of a batch request
+_BATCH_OUTPUTS = "symmetry", "curves", "surfaces"
+_BATCH_SIZE = 256
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -43,6 +54,139 @@ def _3d():
     return subroutine()
 
 
+@app.route("/plots/<kind>")
+def plot_data(kind):
+    """Send the "curves" or "surfaces" data of a material as a resource that
+    can be kept in HTTP caches.
+
+    The material is given in the query string by its name `material`, or by
+    its stiffness matrix `C` as JSON and its density `rho`.
+    The response has an ETag of the material and the version of the plots,
+    so that requests of clients that have the data are answered with 304
+    before calculating anything. If the query has the current version `v`,
+    the data never change, so they can be kept for a year (see
+    `_set_cache_headers`).
+    With the query `stream=1`, the data are streamed in parts (see
+    `_make_stream_response`).
+    The faces of the surfaces are not part of their data, see `plot_faces`.
+    Predefined materials are served from the store in the "json" and
+    "quantized" formats (see `precomputed`).
+    """
+
+    if kind not in ("curves", "surfaces"):
+        abort(404)
+
+    try:
+        C, rho = _read_material_query(request.args)
+    except (KeyError, ValueError):
+        abort(400)
+
+    name = request.args.get("material")
+    format = _get_binary_format() or "json"
+    stream = _is_streamed()
+    etag = _get_etag(kind, format + ":stream" * stream, C, rho)
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    elif (
+        format == "quantized"
+        and (body := _get_precomputed(kind, name, C, rho, format)) is not None
+    ):
+        # Body of the binary transport, sent whole or as a single frame
+        mimetype = transport.STREAM_MIMETYPE if stream else transport.MIMETYPE
+        body = transport.get_frame(body) if stream else body
+        response = app.response_class(body, mimetype=mimetype)
+    elif stream:
+        parts = _get_plot_data(kind, name, C, rho, format, stream=True)
+        response = _make_stream_response({}, None, parts, format)
+    elif format != "json":
+        response = _make_arrays_response(_get_plot_data(kind, name, C, rho, format))
+    else:
+        text = _get_plot_data(kind, name, C, rho, format)
+        response = app.response_class(text, mimetype="application/json")
+
+    return _set_cache_headers(response, etag)
+
+
+@app.route("/plots/faces")
+def plot_faces():
+    """Send the faces of the surfaces of "/plots/surfaces", which are the
+    same for every material, as a resource that is kept in HTTP caches.
+
+    The response has an ETag of the version of the plots, and it is kept for
+    a year if the query has the current version `v`, like the data of
+    `plot_data`.
+    """
+
+    format = _get_binary_format() or "json"
+    etag = _get_etag("faces", format)
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    elif format != "json":
+        response = _make_arrays_response(plots.get_surface_faces(format))
+    else:
+        text = plots.get_surface_faces(format)
+        response = app.response_class(text, mimetype="application/json")
+
+    return _set_cache_headers(response, etag)
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """Send the outputs of many materials, calculated together.
+
+    The request is a JSON object with the following members.
+
+     `materials`: list of materials, given by their name "material" or by
+                  their stiffness matrix "C" and density "rho"
+       `outputs`: optional list with some of "symmetry", "curves" and
+                  "surfaces", by default all of them
+    `resolution`: optional number of angles per turn of the plots, from 8 to
+                  256, by default 64 (see `plots.get_stacked_plot_data`)
+
+    The response has a list "results" with a dict of outputs per material,
+    or with an "error" message if the material is invalid, and the "faces"
+    of the surfaces, which are the same for every material, if they are
+    among the outputs. It is sent in the binary transport if the client asks
+    for it (see `_get_binary_format`).
+    """
+
+    try:
+        materials, outputs, resolution = _read_batch_request(request.get_json())
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+
+    results = [{} for _ in materials]
+    valid = []
+    for result, item in zip(results, materials):
+        try:
+            valid.append((result, *_read_batch_item(item)))
+        except (TypeError, ValueError) as error:
+            result["error"] = str(error)
+
+    format = _get_binary_format()
+    if valid:
+        valid_results, C, rho = zip(*valid)
+        if "symmetry" in outputs:
+            for result, matrix in zip(valid_results, C):
+                result["symmetry"] = material.type(symmetries.detect(matrix))
+        for kind in ("curves", "surfaces"):
+            if kind not in outputs:
+                continue
+            data = plots.get_stacked_plot_data(
+                kind, np.stack(C), np.array(rho), resolution, format=format
+            )
+            for result, item in zip(valid_results, data):
+                result[kind] = item
+
+    data = {"results": results}
+    if "surfaces" in outputs:
+        data |= plots.get_surface_faces(format, resolution)
+    if format is None:
+        return data
+
+    return _make_arrays_response(data)
+
+
 # Subroutines
 def _render_main_page():
     """Load user interface data and send a template to render HTML."""
@@ -54,7 +198,9 @@ def _render_main_page():
 
 def _render_3d_page():
     """Load user interface data for the 3D page and send a template to render HTML."""
-    return render_template("3d.html", materials_data=_get_materials_by_type())
+    return render_template(
+        "3d.html", materials_data=_get_materials_by_type(), version=_get_version()
+    )
 
 
 def _get_main_page_template_kwargs():
@@ -70,16 +216,7 @@ def _get_main_page_template_kwargs():
 def _get_materials_by_type():
     """Return a dict with material types as keys and materials as values."""
 
-    materials_by_type = {}
-
-    for name in material.CONSTANTS:
-        material_type = symmetries.detect(material.CONSTANTS[name].matrix)
-        material_type = material.type(material_type)
-        if material_type not in materials_by_type:
-            materials_by_type[material_type] = []
-        materials_by_type[material_type].append(name)
-
-    return materials_by_type
+    return material.get_names_by_type()
 
 
 def _send_json_response():
@@ -101,19 +238,254 @@ def _send_json_response():
 
 
 def _send_json_response_3d():
-    """Read request data, process and send response with 3D surface points and faces."""
+    """Read request data, process and send response with 3D surface points.
+    The faces of the surfaces are sent by `plot_faces`.
+    """
 
     data = _send_response_material(request.json)
 
     rho = data["rho"]
     C = data["C"]
 
-    plot_data_3d = plots.get_velocity_surfaces(C, rho)
+    name = request.json["material"]
+    format = _get_binary_format() or "json"
+    if _is_streamed():
+        parts = _get_plot_data("surfaces", name, C, rho, format, stream=True)
+        return _make_stream_response({}, "plotData3d", parts, format)
 
-    return {
-        "plotData3d": plot_data_3d,
+    plot_data_3d = _get_plot_data("surfaces", name, C, rho, format)
+    if format != "json":
+        return _make_arrays_response({"plotData3d": plot_data_3d})
+
+    return _make_json_response({}, plotData3d=plot_data_3d)
+
+
+def _is_streamed():
+    """Return whether the client asks for plot data in parts with the query
+    `?stream=1`.
+    """
+
+    return request.args.get("stream") == "1"
+
+
+def _get_binary_format():
+    """Return the format of plot data in the binary transport (see `transport`)
+    that the client asks for, "arrays" or "quantized", or `None` for JSON.
+
+    The format is given by the query `?format=...`, or else "arrays" is
+    chosen by the Accept header.
+    """
+
+    if request.args.get("format") in ("arrays", "quantized"):
+        return request.args["format"]
+
+    mimetypes = ["application/json", transport.MIMETYPE]
+    if request.accept_mimetypes.best_match(mimetypes) == transport.MIMETYPE:
+        return "arrays"
+
+    return None
+
+
+def _read_material_query(args):
+    """Return the stiffness matrix `C` and density `rho` of the material given
+    in the query string `args` by its name "material", or by "C" as JSON and
+    "rho". Raise KeyError or ValueError if they are missing or invalid.
+    """
+
+    if "material" in args:
+        constants = material.CONSTANTS[args["material"]]
+        return constants.matrix, constants.density
+
+    C = np.array(json.loads(args["C"]), dtype=float)
+    rho = float(args["rho"])
+    if C.shape != (6, 6):
+        raise ValueError("C must be a 6x6 matrix")
+
+    return C, rho
+
+
+def _read_batch_request(data):
+    """Return the materials, outputs and resolution of the JSON `data` of a
+    batch request (see `batch`). Raise KeyError, TypeError or ValueError if
+    they are missing or invalid.
+    """
+
+    materials = data["materials"]
+    outputs = data.get("outputs", _BATCH_OUTPUTS)
+    resolution = data.get("resolution", 64)
+    if not isinstance(materials, list) or len(materials) > _BATCH_SIZE:
+        raise ValueError(f"materials must be a list of at most {_BATCH_SIZE} items")
+    if not set(outputs) <= set(_BATCH_OUTPUTS):
+        raise ValueError(f"outputs must be some of {_BATCH_OUTPUTS}")
+    if type(resolution) is not int or not 8 <= resolution <= 256:
+        raise ValueError("resolution must be an integer from 8 to 256")
+
+    return materials, outputs, resolution
+
+
+def _read_batch_item(item):
+    """Return the stiffness matrix `C` and density `rho` of a material of a
+    batch request, given by its name "material" or by "C" and "rho". Raise
+    TypeError or ValueError with the reason if they are missing or invalid.
+    """
+
+    if not isinstance(item, dict):
+        raise TypeError("a material must be an object")
+
+    if "material" in item:
+        name = item["material"]
+        if not isinstance(name, str) or name not in material.CONSTANTS:
+            raise ValueError(f"unknown material {name!r}")
+        constants = material.CONSTANTS[name]
+        return constants.matrix, constants.density
+
+    try:
+        C = np.array(item["C"], dtype=float)
+        rho = float(item["rho"])
+    except KeyError:
+        raise ValueError("a material needs a name or C and rho") from None
+    except (TypeError, ValueError):
+        raise ValueError("C and rho must be numbers") from None
+    if C.shape != (6, 6):
+        raise ValueError("C must be a 6x6 matrix")
+    if not (np.isfinite(C).all() and np.isfinite(rho)):
+        raise ValueError("C and rho must be finite")
+
+    return C, rho
+
+
+def _get_etag(kind, format, C=None, rho=None):
+    """Return the ETag of the `kind` of plot data in the given `format` of the
+    material with stiffness matrix `C` and density `rho`, or of the data that
+    are the same for every material if they are not given.
+    """
+
+    digest = hashlib.sha1(f"{_get_version()}:{kind}:{format}".encode())
+    if C is not None:
+        digest.update(np.round(np.asarray(C, dtype=float), 9) + 0.0)
+        digest.update(np.round(np.asarray(rho, dtype=float), 9) + 0.0)
+
+    return digest.hexdigest()
+
+
+def _set_cache_headers(response, etag):
+    """Set the `etag` and the headers of HTTP caches of a `response` of plot
+    data and return it. If the query has the current version `v`, the data
+    never change, so they are kept for a year, and otherwise they are
+    revalidated with the ETag.
+    """
+
+    response.set_etag(etag)
+    response.vary.add("Accept")
+    response.cache_control.public = True
+    if request.args.get("v") == _get_version():
+        response.cache_control.max_age = 365 * 24 * 60 * 60
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+
+    return response
+
+
+def _get_plot_data(kind, name, C, rho, format, stream=False):
+    """Return the `kind` of plot data, "curves" or "surfaces", of the material
+    with stiffness matrix `C` and density `rho` in the given `format` (see
+    `plots.ResultCache`), from the store if it is the predefined material
+    `name` and the format is "json".
+    If `stream` is true, return an iterator of the parts of the data instead
+    (see `plots.ResultCache.iter`).
+    """
+
+    text = _get_precomputed(kind, name, C, rho) if format == "json" else None
+    if text is not None:
+        return iter([text]) if stream else text
+
+    functions = {
+        ("curves", False): plots.get_velocity_curves,
+        ("curves", True): plots.iter_velocity_curves,
+        ("surfaces", False): plots.get_velocity_surfaces,
+        ("surfaces", True): plots.iter_velocity_surfaces,
     }
 
+    return functions[kind, stream](C, rho, format=format)
+
+
+def _get_precomputed(kind, name, C, rho, format="json"):
+    """Return the JSON text of the `kind` of plot of the predefined material
+    `name` from the store, or the body of its quantized binary transport if
+    `format` is "quantized", or `None` if it is not there (see
+    `precomputed`).
+    """
+
+    store = _get_store()
+    if store is None or not name:
+        return None
+
+    return store.get(kind, name, C, rho, format)
+
+
+@functools.cache
+def _get_store():
+    """Return the store of plot data of the predefined materials, or `None`
+    if it was not built. It is loaded by the first request that needs it,
+    so that workers start fast.
+    """
+
+    return precomputed.load()
+
+
+@functools.cache
+def _get_version():
+    """Return the version of the constants and plots, which changes the URLs
+    of plot data (see `precomputed.get_version`).
+    """
+
+    return precomputed.get_version()
+
+
+def _make_json_response(data, **serialized):
+    """Return a JSON response with the members of the dict `data` and the
+    given members, whose values are already JSON text.
+    """
+
+    members = [json.dumps(data)[1:-1]] if data else []
+    members += [f"{json.dumps(name)}:{text}" for name, text in serialized.items()]
+
+    return app.response_class(
+        "{" + ",".join(members) + "}", mimetype="application/json"
+    )
+
+
+def _make_arrays_response(data):
+    """Return a response with the dict `data` in the binary transport."""
+
+    return app.response_class(transport.encode(data), mimetype=transport.MIMETYPE)
+
+
+def _make_stream_response(data, name, parts, format):
+    """Return a response that is sent in parts as soon as they are ready: the
+    dict `data`, if it is not empty, and then every part of plot data as the
+    member `name`, or as it is if `name` is `None`.
+    Clients merge the nested dicts of the parts into the whole data.
+
+    In the "json" format, parts are JSON texts, which are sent as lines of
+    JSON (NDJSON), and otherwise they are sent as frames of the binary
+    transport (see `transport.encode_frame`).
+    """
+
+    if format == "json":
+        prefix, suffix = ("", "") if name is None else (f'{{"{name}":', "}")
+        lines = (f"{prefix}{part}{suffix}\n" for part in parts)
+        body = itertools.chain([json.dumps(data) + "\n"] if data else [], lines)
+        return app.response_class(body, mimetype="application/x-ndjson")
+
+    frames = (
+        transport.encode_frame(part if name is None else {name: part}) for part in parts
+    )
+    body = itertools.chain([transport.encode_frame(data)] if data else [], frames)
+
+    return app.response_class(body, mimetype=transport.STREAM_MIMETYPE)
+
 
 def _send_response_material(data):
     """Read name of material and return the corresponding constants."""
@@ -150,10 +522,14 @@ def _send_response_numbers(data):
     symmetry_type = material.type(symmetries.detect(C))
     material_name = material.detect(C, rho)
 
-    plot_data_2d = plots.get_velocity_curves(C, rho)
+    data = {"symmetry": symmetry_type, "material": material_name}
+    format = _get_binary_format() or "json"
+    if _is_streamed():
+        parts = _get_plot_data("curves", material_name, C, rho, format, stream=True)
+        return _make_stream_response(data, "plotData2d", parts, format)
 
-    return {
-        "symmetry": symmetry_type,
-        "material": material_name,
-        "plotData2d": plot_data_2d,
-    }
+    plot_data_2d = _get_plot_data("curves", material_name, C, rho, format)
+    if format != "json":
+        return _make_arrays_response(data | {"plotData2d": plot_data_2d})
+
+    return _make_json_response(data, plotData2d=plot_data_2d)
@@ -0,0 +1,23 @@
+"""Entry point of the web application for ASGI servers, like
+
+    uvicorn asgi:app --workers 1
+
+run from the `src` directory. A single worker of the server is enough, and
+keeps every request on the same caches of plot data.
+
+Requests are served by threads of the server, while plot data are calculated
+in a pool of processes, one per processor, so that bursts of requests do not
+compete for the GIL. Concurrent requests of the same data share a single
+calculation (see `plots.ResultCache`).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+
+import app as application
+import plots
+
+plots.set_executor(ProcessPoolExecutor())
+
+app = WSGIMiddleware(application.app, workers=32)
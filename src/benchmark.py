@@ -0,0 +1,341 @@
+"""Benchmarks of the calculations, the plots and the web application.
+
+Run it from the `src` directory, like
+
+    python -m benchmark --sizes 100 10000
+
+to time the numeric core and the plot adapters with the first predefined
+material of every symmetry type, in 10² to 10⁶ directions by default, and
+the endpoints of the application that calculate plot data, through the test
+client of Flask (see `main`).
+
+Every benchmark is split in stages, each one timed with the result of the
+previous one, so that the cost of the calculations is told apart from the
+cost of serializing their results:
+
+     `compute`: calculation of the arrays
+      `tolist`: conversion of the arrays into lists
+        `json`: encoding of the lists as JSON text
+     `request`: whole request to an endpoint, whose compute, tolist and
+                json stages are those of the endpoint
+
+Times are the best of many calls (see `measure`). They are compared against
+the baseline of the file `BASELINE_PATH`, which is written with `--save`,
+and the stages that got slower than the baseline by more than the threshold,
+25% by default, are listed as regressions, with an exit status of 1.
+Baselines depend on the machine, so save a new one before comparing results
+of another machine.
+"""
+
+import argparse
+import functools
+import gc
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import app
+import calculations
+import material
+import plots
+from material import symmetries
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark.json"
+)
+SIZES = 10**2, 10**4, 10**6
+THRESHOLD = 0.25
+
+
+def get_materials():
+    """Return a dict with the symmetry types of the predefined materials as
+    keys and tuples `(C, rho)` of the first material of each type as values.
+    """
+
+    materials = {}
+    for material_type, names in material.get_names_by_type().items():
+        constants = material.CONSTANTS[names[0]]
+        materials[material_type.lower()] = constants.matrix, constants.density
+
+    return materials
+
+
+def get_directions(size):
+    """Return `size` random unit directions, the same ones on every call."""
+
+    l = np.random.default_rng(0).normal(size=(size, 3))
+
+    return l / np.linalg.norm(l, axis=-1, keepdims=True)
+
+
+def get_benchmarks(sizes=SIZES):
+    """Return a dict with the names of the benchmarks, like
+    "do/cubic/10000", as keys and lists of their stages as values.
+    Stages are tuples `(name, function)`, where the function of the first
+    stage is called without arguments and the others receive the result of
+    the previous stage.
+    """
+
+    benchmarks = {}
+    for material_type, (C, rho) in get_materials().items():
+        for size in sizes:
+            l = get_directions(size)
+            _, c, A = calculations.do(C, rho, l)
+            curves = plots.PolarPlot2D(angle_samples=max(1, size // 3), max_level=0)
+            surfaces = plots.SphericalPlot3D(max(1, round(size**0.5)))
+
+            computations = {
+                "christoffel": functools.partial(
+                    calculations.get_christoffel_tensor, C, l
+                ),
+                "do": functools.partial(calculations.do, C, rho, l),
+                "group": functools.partial(
+                    calculations.get_group_velocities, C, rho, l, c, A
+                ),
+                "curves": functools.partial(curves.get_arrays, C, rho),
+                "surfaces": functools.partial(surfaces.get_arrays, C, rho),
+            }
+            for name, compute in computations.items():
+                benchmarks[f"{name}/{material_type}/{size}"] = [
+                    ("compute", compute),
+                    ("tolist", _to_lists),
+                    ("json", json.dumps),
+                ]
+
+    benchmarks |= get_endpoint_benchmarks()
+
+    return benchmarks
+
+
+def get_endpoint_benchmarks():
+    """Return a dict like `get_benchmarks` with the benchmarks of the
+    endpoints that calculate plot data, like "POST / numbers/cubic", for the
+    first predefined material of every symmetry type.
+
+    Plot data are calculated on every request, as for constants given by the
+    users: the caches of `plots` are cleared, and the density is changed
+    slightly so that the material is not predefined and is not found in the
+    precomputed store.
+    """
+
+    client = app.app.test_client()
+    curves, surfaces = plots._get_adapter("curves"), plots._get_adapter("surfaces")
+
+    benchmarks = {}
+    for material_type, (C, rho) in get_materials().items():
+        rho = rho * (1 + 1e-6)
+        numbers = {"content": "numbers", "C": C.tolist(), "rho": rho}
+        query = {"C": json.dumps(C.tolist()), "rho": rho}
+
+        benchmarks[f"POST / numbers/{material_type}"] = [
+            ("compute", functools.partial(_get_numbers, curves, C, rho)),
+            ("tolist", _to_lists),
+            ("json", json.dumps),
+            ("request", functools.partial(_request, client.post, "/", json=numbers)),
+        ]
+        benchmarks[f"GET /plots/surfaces/{material_type}"] = [
+            ("compute", functools.partial(surfaces.get_arrays, C, rho)),
+            ("tolist", _to_lists),
+            ("json", json.dumps),
+            (
+                "request",
+                functools.partial(
+                    _request, client.get, "/plots/surfaces", query_string=query
+                ),
+            ),
+        ]
+
+    return benchmarks
+
+
+def measure(stages, repeat=3, min_time=0.2, max_time=2.0):
+    """Return a dict with the names of the `stages` of a benchmark (see
+    `get_benchmarks`) as keys and their best times in seconds as values.
+
+    Every stage is called at least `repeat` times and for at least
+    `min_time` seconds, unless its calls take more than `max_time` seconds,
+    so that stages of large sizes, which take seconds, are called once.
+    The garbage collector is disabled meanwhile, like in `timeit`, since its
+    pauses make the stages that build lists vary a lot.
+    """
+
+    times = {}
+    arguments = ()
+    for name, function in stages:
+        best = math.inf
+        total = calls = 0
+        gc.disable()
+        try:
+            while calls < repeat and total < max_time or total < min_time:
+                start = time.perf_counter()
+                result = function(*arguments)
+                elapsed = time.perf_counter() - start
+                best = min(best, elapsed)
+                total += elapsed
+                calls += 1
+        finally:
+            gc.enable()
+        times[name] = best
+        arguments = (result,)
+        gc.collect()
+
+    return times
+
+
+def run(benchmarks, verbose=False):
+    """Return a dict with the names of the stages of the `benchmarks`, like
+    "do/cubic/10000/compute", as keys and their times in seconds as values.
+    """
+
+    results = {}
+    for benchmark, stages in benchmarks.items():
+        times = measure(stages)
+        for stage, seconds in times.items():
+            results[f"{benchmark}/{stage}"] = seconds
+        if verbose:
+            stages = ", ".join(f"{stage} {_format(s)}" for stage, s in times.items())
+            print(f"{benchmark}: {stages}")
+
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Return a list of tuples `(name, old, new)` with the `results` that are
+    slower than their times in the `baseline` by more than the fraction
+    `threshold` of them. Results that are not in the baseline are skipped.
+    """
+
+    return [
+        (name, baseline[name], seconds)
+        for name, seconds in results.items()
+        if name in baseline and seconds > baseline[name] * (1 + threshold)
+    ]
+
+
+def load(path=BASELINE_PATH):
+    """Return the baseline of the file `path`, or an empty dict if it does
+    not exist.
+    """
+
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save(results, path=BASELINE_PATH):
+    """Write the `results` to the file `path` as the new baseline, keeping
+    the benchmarks of the old baseline that were not run.
+    """
+
+    baseline = load(path) | results
+    with open(path, "w") as file:
+        json.dump(dict(sorted(baseline.items())), file, indent=2)
+        file.write("\n")
+
+
+def _get_numbers(adapter, C, rho):
+    """Return the data of the response of `POST /` with the content
+    "numbers", with the curves of the plot `adapter` as arrays.
+    """
+
+    return {
+        "symmetry": material.type(symmetries.detect(C)),
+        "material": material.detect(C, rho),
+        "plotData2d": adapter.get_arrays(C, rho),
+    }
+
+
+def _request(method, path, _=None, **kwargs):
+    """Return the response of a request to `path` with the `method` of a
+    test client, like `client.get`, after clearing the caches of `plots`.
+    The result of the previous stage of the benchmark is ignored.
+    """
+
+    for cache in plots._caches.values():
+        cache.clear()
+
+    response = method(path, **kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} answered with {response.status_code}")
+
+    return response
+
+
+def _to_lists(data):
+    """Convert the arrays of `data`, which may be a tuple of arrays, to lists
+    (see `plots._to_lists`).
+    """
+
+    if isinstance(data, tuple):
+        return [plots._to_lists(item) for item in data]
+
+    return plots._to_lists(data)
+
+
+def _format(seconds):
+    """Return the text of a time in `seconds` with a suitable unit."""
+
+    for unit, scale in ("s", 1), ("ms", 1e-3), ("µs", 1e-6):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark",
+        description="Time the calculations, the plots and the web application.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="numbers of directions (default: 100 10000 1000000)",
+    )
+    parser.add_argument(
+        "--only", nargs="+", help="run only the benchmarks that start with these"
+    )
+    parser.add_argument(
+        "--baseline", default=BASELINE_PATH, help="JSON file of the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help=f"fraction of slowdown that is a regression (default: {THRESHOLD})",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="write the results as the baseline"
+    )
+    args = parser.parse_args()
+
+    benchmarks = get_benchmarks(args.sizes)
+    if args.only:
+        benchmarks = {
+            name: stages
+            for name, stages in benchmarks.items()
+            if name.startswith(tuple(args.only))
+        }
+    results = run(benchmarks, verbose=True)
+
+    if args.save:
+        save(results, args.baseline)
+        return
+
+    regressions = compare(results, load(args.baseline), args.threshold)
+    for name, old, new in regressions:
+        print(f"regression: {name} {_format(old)} -> {_format(new)}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
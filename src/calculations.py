@@ -1,14 +1,32 @@
 """Calculation of phase and group velocities and polarization vectors."""
 
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
 import numpy as np
 
+from material import symmetries
+from material.types import Material
+
+default_dtype = np.float64
+"""Floating point type of the results when no `dtype` is given.
+Set it to `np.float32` to halve memory use in every calculation."""
+
+
+def _get_dtype(dtype):
+    """Return the given floating point type or the default one if `None`."""
 
-def _null_output(l):
+    return np.dtype(default_dtype if dtype is None else dtype)
+
+
+def _null_output(l, dtype=None, batch=()):
     """Receive propagation vector stack `l` and return a tuple with three null
-    components `Gamma`, `c`, `A`.
+    components `Gamma`, `c`, `A`, with the shape `batch` of a stack of
+    materials as leading dimensions.
     """
 
-    z = np.zeros(np.shape(l) + (3,))
+    z = np.zeros(batch + np.shape(l) + (3,), dtype=_get_dtype(dtype))
 
     return z, z[..., 0], z
 
@@ -43,31 +61,321 @@ class SlimMatrix:
         return matrix
 
 
-def get_christoffel_tensor(C, l):
+class ChristoffelOperator:
+    """Christoffel tensor of a material as a function of the direction of
+    wave propagation.
+    Construct an object from this class with the inputs
+
+          `C`: stiffness matrix in GPa = 10⁹ N/m²
+        `rho`: density in kg/m³
+      `dtype`: floating point type of the results (see `default_dtype`)
+
+    and call it with a stack of directions `l` to get the Christoffel tensor
+    `Gamma` in GPa, like `get_christoffel_tensor` does.
+
+    Every component of `Gamma` is a quadratic form of `l`, so it is a linear
+    combination of the six monomials `l_i l_j`, whose coefficients only
+    depend on `C`.
+    Those coefficients are computed once on construction, so that `Gamma` is
+    obtained with a single matrix product for any number of directions.
+
+    `C` may also be a stack of stiffness matrices, e.g. with shape (M, 6, 6),
+    and `rho` an array that broadcasts to the shape of the stack, e.g. (M,).
+    Then the results have the dimensions of the stack first, followed by the
+    ones of the directions, e.g. `Gamma.shape` is (M, k, 3, 3) if `l.shape`
+    is (k, 3).
+    """
+
+    # Pairs of indices (i, j) in Voigt order: xx, yy, zz, yz, xz, xy
+    pairs = np.array([[0, 1, 2, 1, 0, 0], [0, 1, 2, 2, 2, 1]])
+    # Voigt index of each component of a symmetric 3x3 tensor
+    voigt = np.array([[0, 5, 4], [5, 1, 3], [4, 3, 2]])
+
+    def __init__(self, C, rho, dtype=None):
+        self.dtype = _get_dtype(dtype)
+        self.C = np.asarray(C, dtype=self.dtype)
+        self.rho = rho
+        self.batch = self.C.shape[:-2]
+        self.coefficients = self._get_coefficients(np.asarray(C, dtype=float))
+        self.coefficients = self.coefficients.astype(self.dtype)
+
+    def __call__(self, l):
+        """Return the Christoffel tensor for the directions `l`."""
+
+        l = np.asarray(l, dtype=self.dtype)
+        monomials = l[..., self.pairs[0]] * l[..., self.pairs[1]]
+        if self.batch:
+            # One matrix product per material, with a direction per row
+            coefficients = self.coefficients.reshape(-1, 6, 6)
+            products = monomials.reshape(-1, 6) @ coefficients
+            products = products.reshape(self.batch + monomials.shape)
+        else:
+            products = monomials @ self.coefficients
+
+        return products[..., self.voigt]
+
+    def get_group_velocities(self, l, c, A, out=None):
+        """Return the group velocities in m/s for the unit directions `l`,
+        phase velocities `c` and polarizations `A`, like
+        `get_group_velocities` does.
+        If given, `out` is filled with the result and returned.
+        For a stack of materials, `c` and `A` have the dimensions of the
+        stack first and `l` only has the ones of the directions.
+
+        The group velocity of a mode with polarization `a` is the gradient
+        of `aᵀ·Gamma(l)·a / 2` divided by `rho·c`.
+        Since `aᵀ·Gamma·a` is a bilinear form of the monomials of `l` and
+        the monomials of `a`, their coefficients are the ones of `Gamma`.
+        """
+
+        shape = np.broadcast_shapes(self.batch + np.shape(l)[:-1], np.shape(A)[:-2])
+        if out is None:
+            out = np.empty(shape + (3, 3), dtype=self.dtype)
+        g = np.moveaxis(out, (-2, -1), (0, 1))  # view of out
+
+        # Contiguous components with one material per row (a single one if
+        # `C` is not a stack) and one direction per column
+        size = int(np.prod(self.batch))
+        directions = shape[len(self.batch) :]
+        l = np.broadcast_to(l, directions + (3,)).reshape(1, -1, 3)
+        l = np.ascontiguousarray(np.moveaxis(l, -1, 0), dtype=out.dtype)
+        A = np.broadcast_to(A, shape + (3, 3)).reshape(size, -1, 9)
+        A = np.ascontiguousarray(np.moveaxis(A, -1, 0), dtype=out.dtype)
+        coefficients = self.coefficients.reshape(size, 6, 6)
+
+        q = np.empty((6,) + A.shape[1:], dtype=out.dtype)
+        for mode in range(3):
+            # Monomials of the polarization, off-diagonal ones counted twice
+            x, y, z = A[mode], A[3 + mode], A[6 + mode]
+            np.multiply(x, x, out=q[0])
+            np.multiply(y, y, out=q[1])
+            np.multiply(z, z, out=q[2])
+            np.multiply(2 * y, z, out=q[3])
+            np.multiply(2 * x, z, out=q[4])
+            np.multiply(2 * x, y, out=q[5])
+
+            # Coefficients of the monomials of `l` in `aᵀ·Gamma(l)·a`
+            h = np.moveaxis(coefficients @ np.moveaxis(q, 0, 1), 1, 0)
+
+            # Gradient, where the derivative of each square doubles it
+            h[:3] *= 2
+            g[0, mode] = (l[0] * h[0] + l[2] * h[4] + l[1] * h[5]).reshape(shape)
+            g[1, mode] = (l[1] * h[1] + l[2] * h[3] + l[0] * h[5]).reshape(shape)
+            g[2, mode] = (l[2] * h[2] + l[1] * h[3] + l[0] * h[4]).reshape(shape)
+
+        rho = np.broadcast_to(np.asarray(self.rho, dtype=out.dtype), self.batch)
+        rho = rho.reshape(self.batch + (1,) * (len(directions) + 2))
+        out *= 1e9 / 2  # convert units to m/s, with the 1/2 of the gradient
+        out /= rho * np.asarray(c, dtype=out.dtype)[..., np.newaxis, :]
+
+        return out
+
+    @classmethod
+    def _get_coefficients(cls, C):
+        """Return a 6x6 matrix whose element `[m, g]` is the coefficient of
+        the monomial `m` in the component `g` of the Christoffel tensor,
+        both of them given in Voigt order.
+        For a stack of matrices `C`, return a stack of coefficients.
+        """
+
+        # Gamma_ik = Σ L_ai C_ab L_bk with L = SlimMatrix of l, i. e.,
+        # L_ai = Σ P_aij l_j where P is the following selection tensor
+        P = np.zeros([6, 3, 3])
+        P[SlimMatrix.i, SlimMatrix.j, SlimMatrix.k] = 1
+        T = np.einsum("aij,...ab,bkl->...ikjl", P, C, P)  # Gamma_ik = T_ikjl l_j l_l
+
+        i, k = cls.pairs
+        T = T[..., i, k, :, :]
+        coefficients = T[..., i, k] + T[..., k, i]
+        coefficients[..., :3] /= 2  # squares were counted twice
+
+        return np.swapaxes(coefficients, -2, -1)
+
+
+def get_christoffel_tensor(C, l, dtype=None):
     """Calculate Christoffel tensor from the following inputs.
 
           `C`: stiffness matrix in GPa = 10⁹ N/m²
           `l`: direction of wave propagation
+      `dtype`: floating point type of `Gamma` (see `default_dtype`)
 
     Output: `Gamma`, the Christoffel tensor.
 
-    It is assumed that `C.shape == (6, 6)`.
-
     Dimensions of `Gamma` depend on `l`.
     If `l` is a three-dimensional vector, `Gamma.shape` is (3, 3).
     If `l.shape` is (k, 3), `Gamma.shape` is (k, 3, 3).
     If `l.shape` is (m, n, 3), `Gamma.shape` is (m, n, 3, 3), etc.
+    If `C` is a stack of matrices, e.g. `C.shape` is (M, 6, 6), its leading
+    dimensions are prepended, e.g. `Gamma.shape` is (M, k, 3, 3).
 
     Note: `Gamma` will be a Christoffel tensor as long as the direction of
      propagation is a unit vector, i. e., `norm(l) == 1`.
     """
 
-    L = SlimMatrix.get_matrix_from_vector(l)
+    return ChristoffelOperator(C, rho=None, dtype=dtype)(l)
+
+
+def _cross(u, v):
+    """Return the cross product of the vectors given by their components
+    `u = (u0, u1, u2)` and `v = (v0, v1, v2)`, as a tuple of components.
+    """
 
-    return L.swapaxes(-2, -1) @ C @ L
+    return (
+        u[1] * v[2] - u[2] * v[1],
+        u[2] * v[0] - u[0] * v[2],
+        u[0] * v[1] - u[1] * v[0],
+    )
+
+
+def _dot(u, v):
+    """Return the dot product of the vectors given by their components."""
+
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def _get_orthonormal_basis(v):
+    """Return two unit vectors `u1`, `u2` such that `v`, `u1`, `u2` is a
+    right-handed orthonormal basis, given the components of the unit vector
+    `v`.
+
+    `u1` is the cross product of `v` and an axis (x or y) that is not
+    parallel to it.
+    """
+
+    use_x = np.abs(v[0]) < 0.9
+    zero = np.zeros_like(v[0])
+    u1 = np.where(use_x, (zero, v[2], -v[1]), (v[2], zero, -v[0]))
+    u1 /= _dot(u1, u1) ** 0.5
+
+    return u1, np.array(_cross(v, u1))
+
+
+def _rotate_2x2(b11, b22, b12):
+    """Diagonalize the symmetric 2x2 matrices with entries `b..` by means
+    of a rotation.
+
+    Return a tuple `cos`, `sin`, `w1`, `w2` where `cos` and `sin` are the
+    ones of the rotation angle and `w1 >= w2` are the eigenvalues, whose
+    eigenvectors are `(cos, sin)` and `(-sin, cos)` respectively.
+    """
 
+    theta = np.arctan2(2 * b12, b11 - b22) / 2
+    cos, sin = np.cos(theta), np.sin(theta)
+    cos2, sin2, sincos = cos**2, sin**2, 2 * sin * cos * b12
+    w1 = cos2 * b11 + sin2 * b22 + sincos
+    w2 = sin2 * b11 + cos2 * b22 - sincos
 
-def get_group_velocities(C, rho, l, c, A):
+    return cos, sin, w1, w2
+
+
+def _get_isolated_eigenvector(a00, a11, a22, a12, a02, a01, w):
+    """Return the components of a unit eigenvector of the symmetric matrices
+    with entries `a..` for the eigenvalues `w`, assumed to be non-degenerate.
+
+    The eigenvector is orthogonal to every row of `a - w·I`, so it is taken
+    as the largest cross product between two of those rows.
+    If all the cross products vanish (`a` is a multiple of the identity),
+    any vector is an eigenvector and the x axis is returned.
+    """
+
+    r0 = a00 - w, a01, a02
+    r1 = a01, a11 - w, a12
+    r2 = a02, a12, a22 - w
+    u01, u02, u12 = _cross(r0, r1), _cross(r0, r2), _cross(r1, r2)
+    n01, n02, n12 = _dot(u01, u01), _dot(u02, u02), _dot(u12, u12)
+
+    use_01 = (n01 >= n02) & (n01 >= n12)
+    use_02 = ~use_01 & (n02 >= n12)
+    v = np.where(use_01, u01, np.where(use_02, u02, u12))
+    norm = np.where(use_01, n01, np.where(use_02, n02, n12)) ** 0.5
+
+    scale = _dot(r0, r0) + _dot(r1, r1) + _dot(r2, r2)
+    null = norm <= 1e-12 * scale
+    v /= np.where(null, 1, norm)
+    v[0, null], v[1, null], v[2, null] = 1, 0, 0
+
+    return v
+
+
+def eigh_3x3(a):
+    """Calculate eigenvalues and eigenvectors of real symmetric 3x3 matrices.
+
+    `a` is a stack of matrices, i. e., `a.shape[-2:] == (3, 3)`.
+
+    Return a tuple `w`, `v` like `np.linalg.eigh` does, where
+        `w`: eigenvalues in ascending order
+        `v`: matrix with normalized eigenvectors per column
+
+    Eigenvalues are found in closed form with the trigonometric solution of
+    the characteristic cubic (Cardano).
+    The eigenvector of the eigenvalue that is farthest from the other two is
+    obtained with cross products.
+    The remaining two are obtained by diagonalizing `a` in the plane
+    orthogonal to the first one, so that near-degenerate matrices, like
+    Christoffel tensors in the direction of acoustic axes, still get an
+    orthonormal basis of eigenvectors.
+    """
+
+    a = np.asarray(a)
+    shape = a.shape[:-2]
+    a = a.reshape(-1, 9).T.copy()  # contiguous components
+    a00, a11, a22, a12, a02, a01 = a[0], a[4], a[8], a[5], a[2], a[1]
+
+    # Eigenvalues of the traceless matrix `(a - q·I) / p`
+    q = (a00 + a11 + a22) / 3
+    d00, d11, d22 = a00 - q, a11 - q, a22 - q
+    p = ((d00**2 + d11**2 + d22**2 + 2 * (a01**2 + a02**2 + a12**2)) / 6) ** 0.5
+    det = (
+        d00 * (d11 * d22 - a12**2)
+        - a01 * (a01 * d22 - a12 * a02)
+        + a02 * (a01 * a12 - d11 * a02)
+    )
+    r = np.clip(det / (2 * np.where(p > 0, p, 1) ** 3), -1, 1)
+    phi = np.arccos(r) / 3
+    w_max = q + 2 * p * np.cos(phi)
+    w_min = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+    w_mid = 3 * q - w_max - w_min
+
+    # Eigenvector of the most isolated eigenvalue
+    is_max = w_max - w_mid >= w_mid - w_min
+    v0 = _get_isolated_eigenvector(
+        a00, a11, a22, a12, a02, a01, np.where(is_max, w_max, w_min)
+    )
+
+    # Diagonalize the 2x2 restriction of `a` to the plane orthogonal to `v0`
+    def apply(u):
+        return (
+            a00 * u[0] + a01 * u[1] + a02 * u[2],
+            a01 * u[0] + a11 * u[1] + a12 * u[2],
+            a02 * u[0] + a12 * u[1] + a22 * u[2],
+        )
+
+    u1, u2 = _get_orthonormal_basis(v0)
+    b11, b22, b12 = _dot(u1, apply(u1)), _dot(u2, apply(u2)), _dot(u1, apply(u2))
+    cos, sin, w1, w2 = _rotate_2x2(b11, b22, b12)
+    v1 = cos * u1 + sin * u2
+    v2 = cos * u2 - sin * u1
+
+    # The Rayleigh quotient is more accurate than the trigonometric solution
+    w0 = _dot(v0, apply(v0))
+
+    # Ascending order is (w2, w1, w0) if w0 is the maximum, else (w0, w2, w1)
+    w = np.empty((len(q), 3), dtype=q.dtype)
+    v = np.empty((len(q), 3, 3), dtype=q.dtype)
+    w[:, 0] = np.where(is_max, w2, w0)
+    w[:, 1] = np.where(is_max, w1, w2)
+    w[:, 2] = np.where(is_max, w0, w1)
+    v[:, :, 0] = np.where(is_max, v2, v0).T
+    v[:, :, 1] = np.where(is_max, v1, v2).T
+    v[:, :, 2] = np.where(is_max, v0, v1).T
+
+    return w.reshape(shape + (3,)), v.reshape(shape + (3, 3))
+
+
+_SOLVERS = {"eigh": np.linalg.eigh, "cardano": eigh_3x3}
+
+
+def get_group_velocities(C, rho, l, c, A, out=None, dtype=None):
     """Calculate group velocities from the following inputs.
 
           `C`: stiffness matrix in GPa = 10⁹ N/m²
@@ -75,10 +383,12 @@ def get_group_velocities(C, rho, l, c, A):
           `l`: direction of wave propagation
           `c`: vector with phase velocities per component in m/s
           `A`: matrix with normalized polarization vectors per column
+        `out`: optional array where the result is stored
+      `dtype`: floating point type of `g` (see `default_dtype`)
 
     Return the group velocity vector `g` in m/s.
 
-    It is assumed that `C.shape == (6, 6)`.
+    `C` and `rho` may be stacks of materials, see `ChristoffelOperator`.
 
     `g.shape` depends on all of its inputs.
     But basically, if `l.shape` is (m, n, 3), `g.shape` is (m, n, 3, 3).
@@ -87,28 +397,200 @@ def get_group_velocities(C, rho, l, c, A):
     `g.shape[-1]` corresponds to a polarization or "mode" like `c.shape[-1]`.
     """
 
-    new_A = SlimMatrix.get_matrix_from_vector(np.asarray(A).swapaxes(-2, -1))
-    new_l = l[..., np.newaxis, np.newaxis, :]
-    g = new_l @ new_A.swapaxes(-2, -1) @ C @ new_A
-    g = g.squeeze().swapaxes(-2, -1) / (rho * c[..., np.newaxis, :])
-    g *= 1e9  # convert units to m/s
+    operator = ChristoffelOperator(C, rho, dtype=dtype)
+
+    return operator.get_group_velocities(l, c, A, out=out)
+
+
+def _get_constants(C):
+    """Return the stiffness matrix `C`, or stack of matrices with shape
+    (M, 6, 6), with its last two axes moved first and a trailing axis, so
+    that every constant `C[i, j]` broadcasts against the components of a
+    stack of directions with shape (k,), giving shapes (k,) or (M, k).
+    """
+
+    return np.moveaxis(C, (-2, -1), (0, 1))[..., np.newaxis]
+
+
+def _get_orthorhombic_christoffel_tensor(C, n):
+    """Return the components `g00`, `g11`, `g22`, `g12`, `g02`, `g01` of the
+    Christoffel tensor of an orthorhombic (or more symmetric) stiffness
+    matrix `C`, given the components of the unit direction `n`.
+    The constants are indexed like `C[i, j]`, see `_get_constants`.
+
+    Only the 9 constants that do not vanish by symmetry are used.
+    """
+
+    n0, n1, n2 = n[0] ** 2, n[1] ** 2, n[2] ** 2
+
+    return (
+        C[0, 0] * n0 + C[5, 5] * n1 + C[4, 4] * n2,
+        C[5, 5] * n0 + C[1, 1] * n1 + C[3, 3] * n2,
+        C[4, 4] * n0 + C[3, 3] * n1 + C[2, 2] * n2,
+        (C[1, 2] + C[3, 3]) * n[1] * n[2],
+        (C[0, 2] + C[4, 4]) * n[0] * n[2],
+        (C[0, 1] + C[5, 5]) * n[0] * n[1],
+    )
+
+
+def _get_matrix_from_components(a00, a11, a22, a12, a02, a01):
+    """Return a stack of symmetric 3x3 matrices from their components."""
+
+    return np.stack([a00, a01, a02, a01, a11, a12, a02, a12, a22], axis=-1).reshape(
+        np.shape(a00) + (3, 3)
+    )
+
+
+def _solve_general(C, n, solver):
+    """Kernel that works for any stiffness matrix `C` and unit directions
+    `n` with shape (k, 3). `C` may be a stack of matrices with shape
+    (M, 6, 6).
+
+    Return a tuple `Gamma`, `w`, `A` with the Christoffel tensor, its
+    eigenvalues (rho · c**2 in GPa) and its eigenvectors, whose leading
+    dimensions are (k,) or (M, k).
+    """
+
+    Gamma = get_christoffel_tensor(C, n, dtype=C.dtype)
+    w, A = _SOLVERS[solver](Gamma)
+
+    return Gamma, w, A
+
+
+def _solve_orthorhombic(C, n, solver):
+    """Kernel for orthorhombic, tetragonal and cubic stiffness matrices.
+    See `_solve_general`.
+    """
+
+    C, n = _get_constants(C), n.T
+    Gamma = _get_matrix_from_components(*_get_orthorhombic_christoffel_tensor(C, n))
+    w, A = _SOLVERS[solver](Gamma)
+
+    return Gamma, w, A
+
+
+def _solve_hexagonal(C, n, solver):
+    """Kernel for hexagonal stiffness matrices with their symmetry axis in
+    the z direction. See `_solve_general`.
+
+    The pure shear mode, polarized in the azimuthal direction, is solved in
+    closed form.
+    The other two modes are polarized in the plane spanned by `n` and the
+    z axis, so they are the solution of a 2x2 problem.
+    """
+
+    C, n = _get_constants(C), n.T
+    Gamma = _get_matrix_from_components(*_get_orthorhombic_christoffel_tensor(C, n))
+
+    # Azimuthal (e_phi) and radial (e_r) unit vectors, perpendicular to z.
+    # Any horizontal pair is valid if `n` is parallel to z.
+    s = (n[0] ** 2 + n[1] ** 2) ** 0.5
+    on_axis = s == 0
+    s = np.where(on_axis, 1, s)
+    zero = np.zeros_like(s)
+    e_phi = np.array([np.where(on_axis, 1, -n[1] / s), n[0] / s, zero])
+    e_r = np.array([e_phi[1], -e_phi[0], zero])  # e_phi × z
+    s = np.where(on_axis, 0, s)
+
+    # Quasi-longitudinal and quasi-transverse modes in the (e_r, z) plane
+    s2, n2 = s**2, n[2] ** 2
+    b11 = C[0, 0] * s2 + C[3, 3] * n2
+    b22 = C[3, 3] * s2 + C[2, 2] * n2
+    b12 = (C[0, 2] + C[3, 3]) * s * n[2]
+    cos, sin, w1, w2 = _rotate_2x2(b11, b22, b12)
+
+    w = np.stack([C[5, 5] * s2 + C[3, 3] * n2, w1, w2], axis=-1)
+    A = np.stack(
+        np.broadcast_arrays(
+            *(e_phi[0], cos * e_r[0], -sin * e_r[0]),
+            *(e_phi[1], cos * e_r[1], -sin * e_r[1]),
+            *(zero, sin, cos),
+        ),
+        axis=-1,
+    ).reshape(Gamma.shape)
+
+    return Gamma, w, A
+
+
+def _solve_isotropic(C, n, solver):
+    """Kernel for isotropic stiffness matrices. See `_solve_general`.
+
+    The longitudinal mode is polarized along `n` and the two transverse
+    modes are polarized in any pair of orthogonal directions perpendicular
+    to `n`.
+    """
+
+    C, n = _get_constants(C), n.T
+    Gamma = _get_matrix_from_components(*_get_orthorhombic_christoffel_tensor(C, n))
+
+    u1, u2 = _get_orthonormal_basis(n)
+    w = np.stack(np.broadcast_arrays(C[3, 3], C[3, 3], C[0, 0], n[0])[:3], axis=-1)
+    A = np.moveaxis(np.stack([u1, u2, n], axis=-1), 0, -2)
+
+    return Gamma, w, np.broadcast_to(A, Gamma.shape)
+
+
+_KERNELS = {
+    "general": _solve_general,
+    "orthorhombic": _solve_orthorhombic,
+    "hexagonal": _solve_hexagonal,
+    "isotropic": _solve_isotropic,
+}
+
+
+def get_kernel(C):
+    """Return the name of the fastest kernel that solves the Christoffel
+    equation for the stiffness matrix `C`, based on its symmetry.
+    For a stack of matrices, return the fastest one that works for all of
+    them.
+    """
+
+    C = np.asarray(C)
+    if C.ndim > 2:
+        names = {get_kernel(matrix) for matrix in C.reshape(-1, 6, 6)}
+        if names <= {"isotropic"}:
+            return "isotropic"
+        if names <= {"isotropic", "hexagonal"}:
+            return "hexagonal"
+        if "general" not in names:
+            return "orthorhombic"
+        return "general"
+
+    symmetry = symmetries.detect(C)
 
-    return g
+    if symmetry == Material.ISOTROPIC:
+        return "isotropic"
+    if symmetry == Material.HEXAGONAL and np.isclose(
+        C[5, 5], (C[0, 0] - C[0, 1]) / 2, rtol=1e-12
+    ):
+        return "hexagonal"
+    if symmetry >= Material.ORTHORHOMBIC:
+        return "orthorhombic"
+    return "general"
 
 
-def do(C, rho, l):
+def do(C, rho, l, solver="eigh", kernel="general", group=False, dtype=None, out=None):
     """Calculate from the following inputs.
 
           `C`: stiffness matrix in GPa = 10⁹ N/m²
         `rho`: density in kg/m³
           `l`: direction of wave propagation
+     `solver`: name of the eigensolver, "eigh" (LAPACK) or "cardano"
+               (closed form, see `eigh_3x3`)
+     `kernel`: name of the algorithm used to solve the Christoffel
+               equation, "general", "orthorhombic", "hexagonal",
+               "isotropic" or "auto" (chosen with `get_kernel`)
+      `group`: whether group velocities are calculated too
+      `dtype`: floating point type of the results (see `default_dtype`)
+        `out`: optional tuple of arrays where the results are stored, in the
+               same order they are returned. Entries may be `None`.
 
     Return a tuple with the three elements `Gamma`, `c`, `A`, where
         `Gamma`: Christoffel matrix in GPa
             `c`: vector with phase velocities per component in m/s
             `A`: matrix with normalized polarization vectors per column
-
-    It is assumed that `C.shape == (6, 6)`.
+    If `group` is true, the group velocities `g` are appended to the tuple,
+    see `get_group_velocities`.
 
     Dimensions of `Gamma`, `c` and `A` depend on `l`.
     If `l` is a three-dimensional vector:
@@ -123,26 +605,422 @@ def do(C, rho, l):
         `A.shape` is (m, n, 3, 3)
     etc.
 
+    `C` may also be a stack of stiffness matrices, e.g. with shape (M, 6, 6),
+    and `rho` an array that broadcasts to the shape of the stack, e.g. (M,).
+    Then the dimensions of the stack are prepended to the ones above, e.g.
+    `c.shape` is (M, m, n, 3) if `l.shape` is (m, n, 3).
+
     Note: `Gamma` will be a Christoffel tensor as long as the direction of
      propagation is a unit vector, i. e., `norm(l) == 1`.
+    The results of a material are null if its density is zero or its matrix
+     `C` is not positive-definite.
     """
 
-    Gamma, c, A = _null_output(l)
+    dtype = _get_dtype(dtype)
+    C = np.asarray(C, dtype=dtype)
+    batch = C.shape[:-2]
+    shape = batch + np.shape(l)[:-1]
+    Gamma, c, A = _null_output(l, dtype, batch)
+    g = A
+    rho = np.broadcast_to(np.asarray(rho, dtype=dtype), batch)
+    valid = rho != 0
 
-    if rho != 0 and np.nonzero(l)[0].size != 0:
+    if valid.any() and np.nonzero(l)[0].size != 0:
         # Normalize direction of wave propagation `l`
-        n = np.copy(l) / np.linalg.norm(l, axis=-1, keepdims=True)
-
-        Gamma = get_christoffel_tensor(C, n)
+        n = np.array(l, dtype=dtype).reshape(-1, 3)
+        n /= np.linalg.norm(n, axis=-1, keepdims=True)
 
         # Get eigenvalues (rho · c**2) and eigenvectors (A) from Gamma.
-        w, A = np.linalg.eigh(Gamma)
-        if (w > 0).all():  # matrix C must be positive-definite
-            c = (w * 1e9 / rho) ** 0.5  # convert units to m/s
+        if kernel == "auto":
+            kernel = get_kernel(C)
+        flat_C = C.reshape(-1, 6, 6) if batch else C
+        Gamma, w, A = _KERNELS[kernel](flat_C, n, solver)
+        Gamma = Gamma.reshape(shape + (3, 3))
+        w = w.reshape(shape + (3,))
+        A = A.reshape(shape + (3, 3))
+
+        # Matrices C must be positive-definite
+        valid = valid & (w > 0).reshape(batch + (-1,)).all(axis=-1)
+        if valid.any():
+            # Shape of the stack of materials, broadcastable against `c`
+            stack_shape = batch + (1,) * (len(shape) - len(batch) + 1)
+            if not valid.all():
+                # Invalid materials get dummy values, nulled afterwards
+                w = np.where(valid.reshape(stack_shape), w, 1)
+                rho = np.where(valid, rho, 1)
+            c = (w * 1e9 / rho.reshape(stack_shape)) ** 0.5  # convert units to m/s
             indices = np.argsort(c)  # ascending order
             c = np.take_along_axis(c, indices, -1)
             A = np.take_along_axis(A, indices[..., np.newaxis, :], -1)
+            if group:
+                operator = ChristoffelOperator(C, rho, dtype=dtype)
+                g_out = out[3] if out is not None else None
+                g = operator.get_group_velocities(n.reshape(np.shape(l)), c, A, g_out)
+            if not valid.all():
+                for result in (Gamma, c, A, g) if group else (Gamma, c, A):
+                    result[~valid] = 0
         else:
-            Gamma, c, A = _null_output(l)
+            Gamma, c, A = _null_output(l, dtype, batch)
+            g = A
+
+    results = (Gamma, c, A, g) if group else (Gamma, c, A)
+    if out is not None:
+        results = tuple(_store(*pair) for pair in zip(out, results))
+
+    return results
+
+
+def _get_unique_rows(a):
+    """Return a tuple `index`, `inverse` for the 2D array `a`, such that
+    `a[index]` has the unique rows of `a` and `a[index][inverse]` is `a`.
+
+    It is faster than `np.unique(a, axis=0)` for a small number of columns.
+    """
+
+    order = np.lexsort(a.T[::-1])
+    sorted_a = a[order]
+    first = np.empty(len(a), dtype=bool)
+    first[:1] = True
+    np.any(sorted_a[1:] != sorted_a[:-1], axis=1, out=first[1:])
+    inverse = np.empty(len(a), dtype=np.intp)
+    inverse[order] = np.cumsum(first) - 1
+
+    return order[first], inverse
+
+
+def get_symmetry(C):
+    """Return the symmetry of the stiffness matrix `C` whose point group is
+    used to fold directions (see `fold_directions`), given by
+    `symmetries.detect`.
+    Hexagonal matrices that are not exactly transversely isotropic are
+    treated as tetragonal.
+    """
+
+    C = np.asarray(C)
+    symmetry = symmetries.detect(C)
+    if symmetry == Material.HEXAGONAL and get_kernel(C) != "hexagonal":
+        return Material.TETRAGONAL
+
+    return symmetry
+
+
+def fold_directions(l, symmetry):
+    """Map the stack of directions `l` to the fundamental region of the point
+    group of `symmetry` (see `symmetries.fold`) and keep one direction of
+    every set of equivalent directions.
+    Directions that differ less than 1e-9 in the fundamental region are
+    considered equal.
+
+    Return a tuple `n`, `R`, `inverse` where `n` has the unique directions in
+    the fundamental region, and `R` and `inverse` are stacks with the shape
+    of `l` such that `l` is `R.T @ n[inverse]`, up to a positive factor.
+    """
+
+    l = np.asarray(l)
+    n, R = symmetries.fold(l.reshape(-1, 3), symmetry)
+
+    # Unique unit directions, with negative zeros made positive
+    norm = np.linalg.norm(n, axis=-1, keepdims=True)
+    u = n / np.where(norm > 0, norm, 1)
+    index, inverse = _get_unique_rows(np.round(u, 9) + 0.0)
+
+    shape = l.shape[:-1]
+
+    return n[index], R.reshape(shape + (3, 3)), inverse.reshape(shape)
+
+
+def do_reduced(C, rho, l, group=False, solve=do, folding=None, **kwargs):
+    """Calculate the same results as `do` solving the Christoffel equation
+    only once for every set of directions of `l` that are equivalent by the
+    symmetry of `C` (see `get_symmetry`).
+
+    The results in the original directions are rebuilt from the ones in the
+    fundamental region as `c`, `R.T @ A` and `R.T @ g`, with the operations
+    `R` of `fold_directions`, while `Gamma` is calculated directly, which is
+    cheaper than rotating it.
+    Since folding only depends on `l` and the symmetry, it may be calculated
+    beforehand and given as `folding`.
+
+    `solve` is the function that calculates the results in the fundamental
+    region, like `do` or `do_parallel`, and other keyword arguments are
+    passed to it.
+    It is assumed that `C.shape == (6, 6)`.
+    """
+
+    l = np.asarray(l)
+    if folding is None:
+        folding = fold_directions(l, get_symmetry(C))
+    n, R, inverse = folding
+    solved = solve(C, rho, n, group=group, **kwargs)
+
+    c = solved[1][inverse]
+    if not c.any():  # null results of an invalid material
+        Gamma, c, A = _null_output(l, c.dtype)
+        return (Gamma, c, A, A) if group else (Gamma, c, A)
+
+    R_T = R.astype(c.dtype).swapaxes(-2, -1)
+    results = (
+        get_christoffel_tensor(
+            C, l / np.linalg.norm(l, axis=-1, keepdims=True), dtype=c.dtype
+        ),
+        c,
+        R_T @ solved[2][inverse],
+        R_T @ solved[3][inverse] if group else None,
+    )
+
+    return results if group else results[:3]
+
+
+def _store(out, result):
+    """Copy `result` into the array `out` and return `out`.
+    If `out` is `None`, return `result`.
+    """
+
+    if out is None:
+        return result
+    if out is not result:
+        out[...] = result
+
+    return out
+
+
+def iter_solve(C, rho, l, chunk=2**16, group=False, dtype=None, **kwargs):
+    """Calculate the same results as `do` for the stack of directions `l`,
+    by tiles of at most `chunk` directions, so that the memory in use does
+    not depend on the number of directions.
+    Other keyword arguments are passed to `do`.
+
+    Generate a tuple `(start, stop, results)` for every tile, where
+    `results` is the tuple returned by `do` for the directions
+    `l.reshape(-1, 3)[start:stop]`.
+    The arrays in `results` are buffers that are reused by the next tile,
+    so they must be copied if they are needed afterwards.
+
+    The validity of the material is checked by `do` in every tile, with the
+    eigenvalues of `Gamma`. So the tiles agree with each other for strongly
+    elliptic materials, whose eigenvalues are positive in every direction,
+    but otherwise only the tiles with a direction of non-positive
+    eigenvalues are null, while `do` would null all the directions.
+    `C` must be a single stiffness matrix, not a stack of them.
+    """
+
+    dtype = _get_dtype(dtype)
+    l = np.asarray(l).reshape(-1, 3)
+
+    size = min(chunk, len(l))
+    buffers = [
+        np.empty((size, 3, 3), dtype),
+        np.empty((size, 3), dtype),
+        np.empty((size, 3, 3), dtype),
+        np.empty((size, 3, 3), dtype),
+    ][: 4 if group else 3]
+
+    for start in range(0, len(l), chunk):
+        stop = min(start + chunk, len(l))
+        out = tuple(buffer[: stop - start] for buffer in buffers)
+        results = do(C, rho, l[start:stop], group=group, dtype=dtype, out=out, **kwargs)
+        yield start, stop, results
+
+
+def solve_into(C, rho, l, out, chunk=2**16, **kwargs):
+    """Calculate the same results as `do` for the stack of directions `l` by
+    tiles (see `iter_solve`) and store them in the arrays of the tuple
+    `out`, ordered like the results of `do`.
+    Entries of `out` may be `None` to skip a result, and group velocities
+    are calculated if `out` has four entries.
+    Other keyword arguments are passed to `iter_solve`.
+
+    The arrays in `out` may be memory-mapped (see `open_memmaps`) and must
+    be contiguous, with shapes like the ones `do` would return.
+    Return `out`.
+    """
+
+    shape = np.shape(l)[:-1]
+    flat_out = []
+    for array in out:
+        if array is not None:
+            flat_array = array.reshape((-1,) + array.shape[len(shape) :])
+            if not np.may_share_memory(flat_array, array):
+                raise ValueError("output arrays must be contiguous")
+            array = flat_array
+        flat_out.append(array)
+
+    tiles = iter_solve(C, rho, l, chunk=chunk, group=len(out) == 4, **kwargs)
+    for start, stop, results in tiles:
+        for array, result in zip(flat_out, results):
+            if array is not None:
+                array[start:stop] = result
+
+    return out
+
+
+def open_memmaps(directory, shape, group=False, dtype=None):
+    """Create files "Gamma.npy", "c.npy", "A.npy" (and "g.npy" if `group`)
+    in `directory` for the results of `do` for a stack of directions with
+    `shape[:-1]` as leading dimensions, like `l.shape`.
+
+    Return a tuple with the memory-mapped arrays, ready for `solve_into`.
+    """
+
+    dtype = _get_dtype(dtype)
+    names = ["Gamma", "c", "A", "g"][: 4 if group else 3]
+    trailing_shapes = [(3, 3), (3,), (3, 3), (3, 3)]
+
+    return tuple(
+        np.lib.format.open_memmap(
+            os.path.join(directory, f"{name}.npy"),
+            mode="w+",
+            dtype=dtype,
+            shape=tuple(shape[:-1]) + trailing_shape,
+        )
+        for name, trailing_shape in zip(names, trailing_shapes)
+    )
+
+
+_EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+_executors = {}
+
+
+def _get_executor(pool, workers):
+    """Return a pool of the kind `pool` ("thread" or "process") with the
+    given number of `workers`, creating it the first time it is requested.
+    """
+
+    key = pool, workers
+    if key not in _executors:
+        _executors[key] = _EXECUTORS[pool](max_workers=workers)
+
+    return _executors[key]
+
+
+def _solve_shared_block(C, rho, l, start, stop, shared, kwargs):
+    """Run `solve_into` for the directions `l` in a process of a pool,
+    storing the results in the rows `start:stop` of the arrays described by
+    `shared`, a list of tuples `(name, shape, dtype)` of shared memory blocks
+    created by the parent process.
+    """
+
+    memories = [SharedMemory(name=name) for name, _, _ in shared]
+    out = tuple(
+        np.ndarray(shape, dtype, buffer=memory.buf)[start:stop]
+        for memory, (_, shape, dtype) in zip(memories, shared)
+    )
+    solve_into(C, rho, l, out, **kwargs)
+
+    del out  # release the buffers before closing the memory blocks
+    for memory in memories:
+        memory.close()
+
+
+def do_parallel(
+    C, rho, l, workers=None, pool="thread", chunk=2**16, group=False, **kwargs
+):
+    """Calculate the same results as `do` splitting the stack of directions
+    `l` in blocks that run concurrently on a pool, one per worker, but of at
+    most `chunk` directions.
+
+    `workers` is the number of threads or processes, by default the number of
+    processors in the machine.
+    `pool` is the kind of pool:
+        "thread": threads share the output arrays. NumPy releases the GIL in
+                  the heavy kernels, so they run in parallel.
+        "process": processes write the results in shared memory.
+    Other keyword arguments are passed to `iter_solve`, see the note about
+    validity there.
+    """
+
+    dtype = _get_dtype(kwargs.pop("dtype", None))
+    l = np.asarray(l)
+    shape = l.shape[:-1]
+    size = int(np.prod(shape))
+    flat_l = l.reshape(-1, 3)
+    trailing_shapes = [(3, 3), (3,), (3, 3), (3, 3)][: 4 if group else 3]
+    shapes = [(size,) + trailing_shape for trailing_shape in trailing_shapes]
+    kwargs = dict(kwargs, chunk=chunk, dtype=dtype)
+    workers = workers or os.cpu_count()
+    executor = _get_executor(pool, workers)
+    block = max(1, min(chunk, -(-size // workers)))
+    blocks = [(start, min(start + block, size)) for start in range(0, size, block)]
+
+    if pool == "process":
+        memories = [
+            SharedMemory(create=True, size=max(int(np.prod(s)) * dtype.itemsize, 1))
+            for s in shapes
+        ]
+        shared = [(m.name, s, dtype) for m, s in zip(memories, shapes)]
+        try:
+            futures = [
+                executor.submit(
+                    _solve_shared_block,
+                    C,
+                    rho,
+                    flat_l[start:stop],
+                    start,
+                    stop,
+                    shared,
+                    kwargs,
+                )
+                for start, stop in blocks
+            ]
+            for future in futures:
+                future.result()
+            out = tuple(
+                np.ndarray(s, dtype, buffer=m.buf).copy()
+                for m, s in zip(memories, shapes)
+            )
+        finally:
+            for memory in memories:
+                memory.close()
+                memory.unlink()
+    else:
+        out = tuple(np.empty(s, dtype) for s in shapes)
+        futures = [
+            executor.submit(
+                solve_into,
+                C,
+                rho,
+                flat_l[start:stop],
+                tuple(array[start:stop] for array in out),
+                **kwargs,
+            )
+            for start, stop in blocks
+        ]
+        for future in futures:
+            future.result()
+
+    return tuple(
+        array.reshape(shape + trailing_shape)
+        for array, trailing_shape in zip(out, trailing_shapes)
+    )
+
+
+def get_precision_report(C, rho, l, dtype=np.float32, **kwargs):
+    """Compare the results of `do` in the floating point type `dtype` with the
+    ones in double precision, for the inputs `C`, `rho` and `l`.
+    Other keyword arguments are passed to `do`.
+
+    Return a dict with the maximum relative errors of
+        `c`: phase velocities
+        `A`: polarizations, measured as `1 - |cos(angle)|` between vectors
+        `g`: group velocities
+    The errors of `A` and `g` only take non-degenerate modes into account,
+    because their polarizations are not unique otherwise.
+    """
+
+    _, c, A, g = do(C, rho, l, group=True, dtype=dtype, **kwargs)
+    _, c64, A64, g64 = do(C, rho, l, group=True, dtype=np.float64, **kwargs)
+
+    # Modes whose phase velocity is far from the ones of the other modes
+    gaps = np.diff(c64, axis=-1) > 1e-3 * c64.max()
+    single = np.ones(c64.shape, dtype=bool)
+    single[..., 1:] &= gaps
+    single[..., :-1] &= gaps
+
+    cosines = np.abs(np.einsum("...ij,...ij->...j", A.astype(float), A64))
+    g_errors = np.linalg.norm(g - g64, axis=-2) / np.linalg.norm(g64, axis=-2).max()
 
-    return Gamma, c, A
+    return {
+        "c": np.max(np.abs(c - c64) / c64.max(), initial=0),
+        "A": np.max(1 - cosines[single], initial=0),
+        "g": np.max(g_errors[single], initial=0),
+    }
@@ -0,0 +1,192 @@
+"""Command-line export of the velocities of many materials.
+
+Run it from the `src` directory, like
+
+    python -m export results --input tensors.csv --subdivisions 4
+
+to calculate the phase velocities, slownesses, group velocities and
+polarizations of every material of a file, or of `material.CONSTANTS` by
+default, in a grid of directions (see `main`).
+
+Materials are spread across a pool of processes. The results of every
+material are written to a compressed `.npz` file of the output directory as
+soon as they are calculated, so that an interrupted export is resumed by
+running it again. Files of materials whose constants changed are written
+again. Each file has the following arrays.
+
+                `l`: unit directions of propagation, with shape (k, 3)
+                `C`: stiffness matrix in GPa
+              `rho`: density in kg/m³
+         `velocity`: phase velocities in m/s, with shape (k, 3), in
+                     ascending order per direction
+         `slowness`: slownesses in s/m, with shape (k, 3)
+    `groupvelocity`: group velocity vectors in m/s, with shape (k, 3, 3),
+                     with a mode per row
+                `A`: normalized polarization vectors, with shape (k, 3, 3),
+                     with a mode per row
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import calculations
+import material
+import plots
+from material import registry
+
+
+def read_materials(path=None):
+    """Return a list of tuples `(name, C, rho)` with the materials of the
+    registry file `path` (see `material.registry`), like a JSON or CSV file,
+    or the predefined ones if it is `None`.
+    Raise KeyError or ValueError if the file is invalid.
+    """
+
+    constants = material.CONSTANTS if path is None else registry.load(path)
+
+    return [
+        (name, constants[name].matrix, constants[name].density) for name in constants
+    ]
+
+
+def get_directions(subdivisions=3):
+    """Return the unit directions of the vertices of an icosahedron that is
+    subdivided `subdivisions` times (see `plots.IcospherePlot3D`).
+    """
+
+    p, _ = plots._get_icosphere(subdivisions)
+
+    return p
+
+
+def export(materials, l, path, workers=None, verbose=False):
+    """Calculate the velocities of the `materials`, a list of tuples
+    `(name, C, rho)`, in the directions `l` on a pool of `workers` processes,
+    by default the number of processors, and write them to the directory
+    `path`. Return the list of the paths of the files of the materials.
+
+    Materials whose file already has the directions `l` and the same
+    constants are not calculated again.
+    """
+
+    os.makedirs(path, exist_ok=True)
+    filenames = [
+        os.path.join(path, f"{_get_slug(name)}.npz") for name, _, _ in materials
+    ]
+    if len(set(filenames)) < len(filenames):
+        raise ValueError("the names of the materials give repeated file names")
+
+    pending = [
+        (name, C, rho, filename)
+        for (name, C, rho), filename in zip(materials, filenames)
+        if not _is_exported(filename, l, C, rho)
+    ]
+    done = len(materials) - len(pending)
+    if verbose and done:
+        print(f"{done}/{len(materials)} already exported")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_export_material, C, rho, l, filename): name
+            for name, C, rho, filename in pending
+        }
+        for future in as_completed(futures):
+            future.result()
+            done += 1
+            if verbose:
+                print(f"{done}/{len(materials)}: {futures[future]}")
+
+    return filenames
+
+
+def _get_slug(name):
+    """Return the file name of the material `name`, without extension."""
+
+    return re.sub(r"[^\w.-]+", "_", name).strip("_")
+
+
+def _is_exported(filename, l, C, rho):
+    """Return whether the file `filename` has the results in directions `l`
+    of the material with stiffness matrix `C` and density `rho`.
+    """
+
+    try:
+        with np.load(filename) as data:
+            return (
+                np.array_equal(data["l"], l)
+                and np.array_equal(data["C"], C)
+                and np.array_equal(data["rho"], rho)
+            )
+    except (OSError, KeyError, ValueError):
+        return False
+
+
+def _export_material(C, rho, l, filename):
+    """Calculate the velocities of the material with stiffness matrix `C` and
+    density `rho` in the directions `l` and write them to `filename`, in a
+    process of a pool.
+    """
+
+    _, c, A, g = calculations.do_reduced(C, rho, l, group=True, kernel="auto")
+    with np.errstate(divide="ignore"):
+        slowness = np.where(c > 0, 1 / c, 0)
+
+    # Write a temporary file first, so that a file is either whole or missing
+    temporary_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(temporary_filename, "wb") as file:
+        np.savez_compressed(
+            file,
+            l=l,
+            C=C,
+            rho=rho,
+            velocity=c,
+            slowness=slowness,
+            groupvelocity=g.swapaxes(-2, -1),
+            A=A.swapaxes(-2, -1),
+        )
+    os.replace(temporary_filename, filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m export",
+        description="Export the velocities of many materials to .npz files.",
+    )
+    parser.add_argument("path", help="output directory")
+    parser.add_argument(
+        "--input", help="JSON or CSV file of materials, by default the predefined ones"
+    )
+    parser.add_argument(
+        "--subdivisions",
+        type=int,
+        default=3,
+        help="subdivisions of the icosahedron of directions (default: 3)",
+    )
+    parser.add_argument(
+        "--directions", help=".npy file with a stack of directions instead"
+    )
+    parser.add_argument("--workers", type=int, help="number of processes")
+    parser.add_argument("--quiet", action="store_true", help="do not show progress")
+    args = parser.parse_args()
+
+    if args.directions is None:
+        l = get_directions(args.subdivisions)
+    else:
+        l = np.load(args.directions).reshape(-1, 3)
+        l = l / np.linalg.norm(l, axis=-1, keepdims=True)
+
+    export(
+        read_materials(args.input),
+        l,
+        args.path,
+        workers=args.workers,
+        verbose=not args.quiet,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
-"""Predefined materials, material detection and definition of types."""
+"""Predefined materials, material detection and definition of types.
 
-import numpy as np
+The materials of a registry file (see `registry`) are used instead of the
+predefined ones if its path is in the environment variable
+ELASTICAS_MATERIALS.
+"""
 
+import os
+
+from . import registry
 from .constants import CONSTANTS
 
+if os.environ.get("ELASTICAS_MATERIALS"):
+    CONSTANTS = registry.load(os.environ["ELASTICAS_MATERIALS"])
+
+# Dict of materials and its registry, built when `CONSTANTS` is a dict
+_registry = None
+
 
 def type(material=None):
     """Return the type corresponding to the given `material`.
@@ -40,16 +52,40 @@ def type(material=None):
 def detect(C, rho):
     """Receive a 6x6 stiffness matrix and a density and return the material.
     If the material doesn't exist, return an empty str.
+
+    Matrices are compared like `np.allclose`, but materials are looked up in
+    an index of `CONSTANTS` (see `index.MaterialIndex`).
+    """
+
+    return _get_registry().find(C, rho)
+
+
+def get_names_by_type():
+    """Return a dict with the types of the materials of `CONSTANTS` as keys
+    and lists of their names as values.
+    """
+
+    return {
+        type(symmetry): names
+        for symmetry, names in _get_registry().get_names_by_symmetry().items()
+    }
+
+
+def _get_registry():
+    """Return `CONSTANTS` as a `registry.Registry`, whose indexes are built
+    only once. If it is a dict, the registry is built again when another
+    dict is assigned to `CONSTANTS` or its size changes.
     """
 
-    C = np.asarray(C)
+    global _registry
 
-    for material_name in CONSTANTS:
-        material_constants = CONSTANTS[material_name]
-        if (
-            np.allclose(material_constants.matrix, C)
-            and material_constants.density == rho
-        ):
-            return material_name
+    if isinstance(CONSTANTS, registry.Registry):
+        return CONSTANTS
+    if (
+        _registry is None
+        or _registry[0] is not CONSTANTS
+        or len(_registry[1]) != len(CONSTANTS)
+    ):
+        _registry = CONSTANTS, registry.Registry.from_constants(CONSTANTS)
 
-    return ""
+    return _registry[1]
@@ -0,0 +1,102 @@
+"""Index of materials by their constants, for detection in constant time."""
+
+import itertools
+
+import numpy as np
+
+# Tolerances of the comparison of matrices, those of `np.allclose`
+RTOL = 1e-5
+ATOL = 1e-8
+
+# Positions of the constants of the upper triangle of a stiffness matrix
+_UPPER = np.triu_indices(6)
+
+# Offset of the edges of the buckets, in widths, far from round values like
+# 0, which most constants are, or 0.5
+_OFFSET = (5**0.5 - 1) / 2
+
+
+class MaterialIndex:
+    """Index of the materials with the given `names`, stiffness `matrices`,
+    with shape (N, 6, 6), and `densities`, with shape (N,).
+    Find a material with `find`.
+
+    Materials are kept in buckets by a fingerprint: their density and the 21
+    constants of the upper triangle of their stiffness matrix, quantized to
+    `width` GPa, with the edges of the buckets shifted from the multiples of
+    `width`, so that zero and round constants are not close to an edge.
+    A query looks in the bucket of its own constants, and also in the
+    neighbouring buckets along the constants that are closer to a boundary
+    than the tolerance, so that matches are the same as with `np.allclose`.
+    If more than `max_probes` buckets should be looked in, all the materials
+    of the density are compared at once instead.
+    """
+
+    def __init__(self, names, matrices, densities, width=1.0, max_probes=64):
+        self.width = width
+        self.max_probes = max_probes
+        self.names = list(names)
+        self.matrices = np.asarray(matrices, dtype=float).reshape(-1, 6, 6)
+        self.densities = np.asarray(densities, dtype=float)
+        self.buckets = {}
+        for i, (matrix, density) in enumerate(zip(self.matrices, self.densities)):
+            key = self._get_key(np.floor(matrix[_UPPER] / width + _OFFSET), density)
+            self.buckets.setdefault(key, []).append(i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, C, rho):
+        """Return the name of the first material whose stiffness matrix is
+        close to `C`, like `np.allclose(matrix, C)`, and whose density is
+        `rho`, or an empty str if there is none.
+        """
+
+        try:
+            C = np.asarray(C, dtype=float)
+            rho = float(rho)
+        except (TypeError, ValueError):
+            return ""
+        if C.shape != (6, 6) or not np.isfinite(C).all():
+            return ""
+
+        low, high = self._get_bucket_ranges(C)
+        if np.prod(high - low + 1) > self.max_probes:
+            candidates = np.flatnonzero(self.densities == rho)
+        else:
+            ranges = [np.arange(a, b + 1) for a, b in zip(low, high)]
+            candidates = sorted(
+                i
+                for key in itertools.product(*ranges)
+                for i in self.buckets.get(self._get_key(np.array(key), rho), ())
+            )
+
+        if len(candidates) == 0:
+            return ""
+
+        matrices = self.matrices[candidates]
+        close = np.abs(matrices - C) <= ATOL + RTOL * np.abs(C)
+        matches = np.flatnonzero(
+            close.all(axis=(1, 2)) & (self.densities[candidates] == rho)
+        )
+
+        return self.names[candidates[matches[0]]] if matches.size else ""
+
+    def _get_bucket_ranges(self, C):
+        """Return a tuple `low`, `high` with the first and last buckets of
+        every constant of the upper triangle of `C` within the tolerance.
+        """
+
+        upper = C[_UPPER]
+        margin = (ATOL + RTOL * np.abs(upper)) * (1 + 1e-6)
+        low = np.floor((upper - margin) / self.width + _OFFSET)
+        high = np.floor((upper + margin) / self.width + _OFFSET)
+
+        return low, high
+
+    def _get_key(self, buckets, density):
+        """Return the key of the bucket of the quantized constants `buckets`
+        and the `density`.
+        """
+
+        return float(density), buckets.astype(np.int64).tobytes()
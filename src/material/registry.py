@@ -0,0 +1,181 @@
+"""Registry of materials whose constants are kept in arrays.
+
+A registry is a mapping of names to constants, like `CONSTANTS`, that is
+loaded from a file (see `load`):
+
+    JSON: list of objects with the "name", the stiffness matrix "C" and the
+          density "rho" of every material
+     CSV: header with the columns "name", "rho" and the components of the
+          upper triangle of the stiffness matrix, from "C11" to "C66", where
+          missing components are zero
+     directory: arrays written by `save`, which are memory-mapped, so that
+          large registries are loaded without reading them
+
+Indexes of names, symmetries and constants are built once, when they are
+first needed.
+"""
+
+import csv
+import json
+import os
+import re
+from collections.abc import Mapping
+
+import numpy as np
+
+from . import symmetries
+from .index import MaterialIndex
+
+
+class Constants:
+    """Stiffness matrix and density of a material of a registry."""
+
+    def __init__(self, matrix, density):
+        self.matrix = matrix
+        self.density = density
+
+    def __repr__(self):
+        return f"Constants({self.density}, {self.matrix.tolist()})"
+
+
+class Registry(Mapping):
+    """Mapping of the material `names` to their `Constants`, whose stiffness
+    matrices are the stack `matrices`, with shape (N, 6, 6), and densities
+    are `densities`, with shape (N,). `symmetries` are the members of
+    `types.Material` of the matrices, which are detected if not given.
+    """
+
+    def __init__(self, names, matrices, densities, symmetries=None):
+        self.names = list(names)
+        self.matrices = matrices
+        self.densities = densities
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self._symmetries = symmetries
+        self._index = None
+        self._names_by_symmetry = None
+        if len(self._positions) < len(self.names):
+            raise ValueError("names of materials are repeated")
+
+    @classmethod
+    def from_constants(cls, constants):
+        """Return the registry of a mapping `constants` like `CONSTANTS`."""
+
+        names = list(constants)
+        matrices = np.array([constants[name].matrix for name in names], dtype=float)
+        densities = np.array([constants[name].density for name in names], dtype=float)
+
+        return cls(names, matrices.reshape(-1, 6, 6), densities)
+
+    def __getitem__(self, name):
+        i = self._positions[name]
+
+        return Constants(np.array(self.matrices[i]), float(self.densities[i]))
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    @property
+    def symmetries(self):
+        """Array of the members of `types.Material` of the materials."""
+
+        if self._symmetries is None:
+            self._symmetries = symmetries.detect(np.asarray(self.matrices))
+
+        return self._symmetries
+
+    def find(self, C, rho):
+        """Return the name of the material with a stiffness matrix close to
+        `C` and density `rho`, or an empty str if there is none (see
+        `index.MaterialIndex.find`).
+        """
+
+        if self._index is None:
+            self._index = MaterialIndex(self.names, self.matrices, self.densities)
+
+        return self._index.find(C, rho)
+
+    def get_names_by_symmetry(self):
+        """Return a dict with the symmetries of the materials as keys and
+        lists of their names as values, in order of appearance.
+        """
+
+        if self._names_by_symmetry is None:
+            names_by_symmetry = {}
+            for name, symmetry in zip(self.names, self.symmetries):
+                names_by_symmetry.setdefault(int(symmetry), []).append(name)
+            self._names_by_symmetry = names_by_symmetry
+
+        return self._names_by_symmetry
+
+
+def load(path):
+    """Return the `Registry` of the materials of the file or directory `path`
+    (see the module). Raise KeyError or ValueError if the file is invalid.
+    """
+
+    if os.path.isdir(path):
+        with open(os.path.join(path, "names.json")) as file:
+            names = json.load(file)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ("matrices", "densities", "symmetries")
+        }
+        return Registry(names, **arrays)
+
+    with open(path, newline="") as file:
+        if path.endswith(".json"):
+            rows = [
+                (item["name"], np.array(item["C"], dtype=float), float(item["rho"]))
+                for item in json.load(file)
+            ]
+        else:
+            rows = [_read_csv_row(row) for row in csv.DictReader(file)]
+
+    for name, C, _ in rows:
+        if C.shape != (6, 6):
+            raise ValueError(f"the stiffness matrix of {name!r} is not 6x6")
+
+    names = [name for name, _, _ in rows]
+    matrices = np.array([C for _, C, _ in rows]).reshape(-1, 6, 6)
+    densities = np.array([rho for _, _, rho in rows])
+
+    return Registry(names, matrices, densities)
+
+
+def save(constants, path):
+    """Write the arrays of a mapping `constants` like `CONSTANTS` to the
+    directory `path`, which `load` memory-maps.
+    """
+
+    if not isinstance(constants, Registry):
+        constants = Registry.from_constants(constants)
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "names.json"), "w") as file:
+        json.dump(constants.names, file)
+    np.save(os.path.join(path, "matrices.npy"), constants.matrices)
+    np.save(os.path.join(path, "densities.npy"), constants.densities)
+    np.save(os.path.join(path, "symmetries.npy"), constants.symmetries)
+
+
+def _read_csv_row(row):
+    """Return the tuple `(name, C, rho)` of a `row` of a CSV file."""
+
+    C = np.zeros([6, 6])
+    for column, value in row.items():
+        if column in ("name", "rho"):
+            continue
+        match = re.fullmatch(r"C([1-6])([1-6])", column)
+        if match is None or match[1] > match[2]:
+            raise ValueError(f"unknown column {column!r}")
+        if value:
+            i, j = int(match[1]) - 1, int(match[2]) - 1
+            C[i, j] = C[j, i] = float(value)
+
+    return row["name"], C, float(row["rho"])
@@ -5,57 +5,194 @@ import numpy as np
 from .types import Material
 
 
-def detect(C):
+def detect(C, atol=0):
     """Receive a 6 by 6 stiffness matrix and return a member of the enum
     `Material` with the symmetry type the matrix has.
     The returned symmetry type can be used as an integer directly.
+
+    `C` may also be a stack of matrices, with shape (..., 6, 6), and then an
+    array with the symmetry types of the matrices is returned.
+    Constants are equal if they differ by at most `atol`, which is zero by
+    default.
     """
     C = np.asarray(C)
-    if ((C[:3, 3:5] == 0) & (C[3:5, 5] == 0)).all():
-        if (C[:3, 5] == 0).all() and C[3, 4] == 0:
-            if C[0, 0] == C[1, 1] and C[0, 2] == C[1, 2] and C[3, 3] == C[4, 4]:
-                if C[0, 0] == C[2, 2] and C[0, 1] == C[0, 2] and C[3, 3] == C[5, 5]:
-                    if C[0, 0] == C[0, 1] + 2 * C[3, 3]:
-                        return Material.ISOTROPIC
-                    return Material.CUBIC
-                if round(C[0, 1] - C[0, 0] + 2 * C[5, 5], 2) == 0:
-                    return Material.HEXAGONAL
-                return Material.TETRAGONAL
-            return Material.ORTHORHOMBIC
-        return Material.MONOCLINIC
-    return Material.TRICLINIC
+    c = C.reshape(C.shape[:-2] + (36,))  # c[..., 6 * i + j] is C[..., i, j]
+
+    def equal(a, b):
+        return np.abs(c[..., a] - c[..., b]) <= atol
+
+    def zero(a):
+        return (np.abs(c[..., a]) <= atol).all(axis=-1)
+
+    monoclinic = zero([3, 4, 9, 10, 15, 16, 23, 29])
+    orthorhombic = monoclinic & zero([5, 11, 17, 22])
+    tetragonal = orthorhombic & equal([0, 2, 21], [7, 8, 28]).all(axis=-1)
+    cubic = tetragonal & equal([0, 1, 21], [14, 2, 35]).all(axis=-1)
+    isotropic = cubic & (np.abs(c[..., 0] - (c[..., 1] + 2 * c[..., 21])) <= atol)
+    difference = c[..., 1] - c[..., 0] + 2 * c[..., 35]
+    hexagonal = (
+        tetragonal
+        & ~cubic
+        & ((np.round(difference, 2) == 0) | (np.abs(difference) <= atol))
+    )
+
+    # Every symmetry type is a subgroup of the previous one, except that
+    # hexagonal and cubic both follow tetragonal
+    symmetry = (
+        monoclinic.astype(np.int8)
+        + orthorhombic
+        + tetragonal
+        + hexagonal
+        + cubic
+        + cubic
+        + isotropic
+    )
+
+    return Material(symmetry.item()) if symmetry.ndim == 0 else symmetry
 
 
 def apply(C, material=Material.TRICLINIC):
     """Return a matrix from the given inputs `C` and `material`.
 
     `material` may be an `int` or a member of the enum `Material`.
+    `C` may also be a stack of matrices, with shape (..., 6, 6), and then
+    all of them are projected onto the `material`.
     """
     new_C = np.asarray(C).copy()
-    if material == Material.MONOCLINIC:
-        new_C[:3, 3:5] = new_C[3:5, 5] = 0
-    elif material == Material.ORTHORHOMBIC:
-        new_C = apply(new_C, Material.MONOCLINIC)
-        new_C[:3, 5] = new_C[3, 4] = 0
+    for step in _PROJECTIONS.get(material, []):
+        step(new_C)
+    upper = np.triu(new_C)
+    return upper + np.triu(new_C, 1).swapaxes(-2, -1)
+
+
+def _project_monoclinic(C):
+    C[..., :3, 3:5] = 0
+    C[..., 3:5, 5] = 0
+
+
+def _project_orthorhombic(C):
+    C[..., :3, 5] = 0
+    C[..., 3, 4] = 0
+
+
+def _project_tetragonal(C):
+    C[..., 1, 1] = C[..., 0, 0]
+    C[..., 1, 2] = C[..., 0, 2]
+    C[..., 4, 4] = C[..., 3, 3]
+
+
+def _project_hexagonal(C):
+    value = (C[..., 0, 0] - C[..., 0, 1]) / 2
+    positive = value > 0
+    C11 = C[..., 0, 1] + 2 * C[..., 5, 5]
+    C[..., 5, 5] = np.where(positive, value, C[..., 5, 5])
+    C[..., 0, 0] = np.where(positive, C[..., 0, 0], C11)
+    C[..., 1, 1] = np.where(positive, C[..., 1, 1], C11)
+
+
+def _project_cubic(C):
+    C[..., 1, 1] = C[..., 2, 2] = C[..., 0, 0]
+    C[..., 0, 2] = C[..., 1, 2] = C[..., 0, 1]
+    C[..., 4, 4] = C[..., 5, 5] = C[..., 3, 3]
+
+
+def _project_isotropic(C):
+    C[..., 0, 0] = C[..., 1, 1] = C[..., 2, 2] = C[..., 0, 1] + 2 * C[..., 3, 3]
+
+
+# Projections onto every symmetry, in the order they are applied
+_PROJECTIONS = {
+    Material.MONOCLINIC: [_project_monoclinic],
+    Material.ORTHORHOMBIC: [_project_monoclinic, _project_orthorhombic],
+    Material.TETRAGONAL: [
+        _project_monoclinic,
+        _project_orthorhombic,
+        _project_tetragonal,
+    ],
+    Material.HEXAGONAL: [
+        _project_monoclinic,
+        _project_orthorhombic,
+        _project_tetragonal,
+        _project_hexagonal,
+    ],
+    Material.CUBIC: [_project_monoclinic, _project_orthorhombic, _project_cubic],
+    Material.ISOTROPIC: [
+        _project_monoclinic,
+        _project_orthorhombic,
+        _project_cubic,
+        _project_isotropic,
+    ],
+}
+
+
+def fold(l, material=Material.TRICLINIC):
+    """Return a tuple `n`, `R` from the given stack of directions `l` and
+    symmetry `material`, where `R` is a stack of orthogonal matrices such that
+    `n = R l` lies in the fundamental region of the directions for the point
+    group of the material, i. e., directions that are equivalent by symmetry
+    are mapped to the same direction of `n`.
+
+    Since velocities do not change if a direction is inverted, the point
+    group includes the inversion besides the operations of the crystal class:
+        Triclinic: inversion, so that `n[..., 2] >= 0`
+        Monoclinic: 2-fold rotation and reflection in the z axis, so that
+                    `n[..., 0] >= 0` and `n[..., 2] >= 0`
+        Orthorhombic: reflections in every axis, so that `n >= 0`
+        Tetragonal: also exchange of x and y, so that `n[..., 0] >= n[..., 1]`
+        Hexagonal: rotations around the z axis, so that `n[..., 1] == 0`,
+                   assuming the matrix is transversely isotropic like `apply`
+                   makes it
+        Cubic: also permutations of the axes, so that `n` is sorted in
+               descending order
+        Isotropic: every reflection, so that `n` is in the z direction
+    """
+    l = np.asarray(l, dtype=float)
+    if material in (Material.HEXAGONAL, Material.ISOTROPIC):
+        R = _get_axial_operations(l, material)
+        return np.einsum("...ij,...j->...i", R, l), R
+
+    # Signed permutations, whose row k has the sign `s[..., k]` in the
+    # column `order[..., k]`
+    s = np.where(l < 0, -1.0, 1.0)
+    order = np.broadcast_to(np.arange(3), l.shape)
+    if material == Material.TRICLINIC:
+        s = s[..., [2, 2, 2]]
+    elif material == Material.MONOCLINIC:
+        s = s[..., [0, 0, 2]]
     elif material == Material.TETRAGONAL:
-        new_C = apply(new_C, Material.ORTHORHOMBIC)
-        new_C[1, 1] = new_C[0, 0]
-        new_C[1, 2] = new_C[0, 2]
-        new_C[4, 4] = new_C[3, 3]
-    elif material == Material.HEXAGONAL:
-        new_C = apply(new_C, Material.TETRAGONAL)
-        value = (new_C[0, 0] - new_C[0, 1]) / 2
-        if value > 0:
-            new_C[5, 5] = value
-        else:
-            new_C[1, 1] = new_C[0, 0] = new_C[0, 1] + 2 * new_C[5, 5]
+        swap = np.abs(l[..., 0]) < np.abs(l[..., 1])
+        order = np.where(swap[..., np.newaxis], [1, 0, 2], order)
     elif material == Material.CUBIC:
-        new_C = apply(new_C, Material.ORTHORHOMBIC)
-        new_C[2, 2] = new_C[1, 1] = new_C[0, 0]
-        new_C[1, 2] = new_C[0, 2] = new_C[0, 1]
-        new_C[5, 5] = new_C[4, 4] = new_C[3, 3]
-    elif material == Material.ISOTROPIC:
-        new_C = apply(new_C, Material.CUBIC)
-        new_C[2, 2] = new_C[1, 1] = new_C[0, 0] = new_C[0, 1] + 2 * new_C[3, 3]
-    new_C = np.triu(new_C)
-    return new_C + new_C.T - np.diag(np.diag(new_C))
+        order = np.argsort(-np.abs(l), axis=-1, kind="stable")
+    rows = np.arange(l.size).reshape(l.shape)  # flat index of row k
+    columns = rows - rows % 3 + order  # flat index of column order[k]
+    if material >= Material.TETRAGONAL:
+        s = s.reshape(-1)[columns]
+    R = np.zeros(l.shape + (3,))
+    R.reshape(-1)[3 * rows + order] = s
+    return s * l.reshape(-1)[columns], R
+
+
+def _get_axial_operations(l, material):
+    """Return the operations of `fold` for the given stack of directions `l`
+    and `material`, which is HEXAGONAL or ISOTROPIC.
+    """
+    R = np.zeros(l.shape + (3,))
+    if material == Material.HEXAGONAL:
+        # Rotation around z to the xz plane and reflection in z
+        radius = np.hypot(l[..., 0], l[..., 1])
+        safe_radius = np.where(radius > 0, radius, 1)
+        cos = np.where(radius > 0, l[..., 0] / safe_radius, 1)
+        sin = np.where(radius > 0, l[..., 1] / safe_radius, 0)
+        R[..., 0, 0], R[..., 0, 1] = cos, sin
+        R[..., 1, 0], R[..., 1, 1] = -sin, cos
+        R[..., 2, 2] = np.where(l[..., 2] < 0, -1.0, 1.0)
+    else:
+        # Householder reflection that maps the direction of `l` to z
+        norm = np.linalg.norm(l, axis=-1, keepdims=True)
+        v = np.where(norm > 0, l / np.where(norm > 0, norm, 1), 0)
+        v[..., 2] -= 1
+        vv = np.sum(v**2, axis=-1)[..., np.newaxis, np.newaxis]
+        outer = v[..., :, np.newaxis] * v[..., np.newaxis, :]
+        R = np.eye(3) - 2 * outer / np.where(vv > 0, vv, 1)
+    return R
@@ -1,8 +1,68 @@
 """Module for generating curves and surfaces of velocity and slowness."""
 
+import functools
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+
 import numpy as np
 
 import calculations
+import transport
+
+
+def _to_list(array):
+    """Convert `array` to a nested list of floats.
+
+    Single precision values are rounded to the significant digits they
+    have, so that their text representation is short in JSON.
+    """
+
+    if array.dtype == np.float32 and array.size:
+        magnitude = np.abs(array).max()
+        digits = 7 - int(np.ceil(np.log10(magnitude))) if magnitude > 0 else 0
+        array = array.astype(float).round(digits)
+
+    return array.tolist()
+
+
+def _to_lists(data):
+    """Convert the arrays of the nested dicts `data` to nested lists of floats
+    (see `_to_list`).
+    """
+
+    if isinstance(data, dict):
+        return {key: _to_lists(value) for key, value in data.items()}
+    if isinstance(data, np.ndarray):
+        return _to_list(data)
+
+    return data
+
+
+def _merge(parts):
+    """Return the dict with the items of the nested dicts `parts`, where the
+    items of later parts are added to the dicts of earlier ones.
+    """
+
+    data = {}
+    for part in parts:
+        _update(data, part)
+
+    return data
+
+
+def _update(data, part):
+    """Add the items of the nested dicts `part` to the nested dicts `data`."""
+
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _update(data.setdefault(key, {}), value)
+        else:
+            data[key] = value
 
 
 class PolarPlot2D:
@@ -11,22 +71,99 @@ class PolarPlot2D:
 
              `C`: stiffness matrix in GPa = 10⁹ N/m²
            `rho`: density in kg/m³
-    """
+         `dtype`: optional floating point type of the calculations
 
-    def __init__(self):
-        angle_samples = int(2 * np.pi * 500)
-        t = np.linspace(0, 2 * np.pi, angle_samples, endpoint=False)
-        p = np.column_stack([np.cos(t), np.sin(t), np.zeros_like(t)])
-        permutations = [[0, 1, 2], [0, 2, 1], [2, 0, 1]]
+    Curves are sampled adaptively in every plane.
+    Sampling starts with `angle_samples` equally spaced angles, and every
+    interval between consecutive angles is bisected while the curves in it
+    deviate from the straight segment drawn between its ends by more than
+    `tolerance` times the radius of the plot, at most `max_level` times.
+    The default tolerance is about a pixel in a plot of 500 pixels of radius,
+    so that cusps and mode crossings get dense samples and smooth curves get
+    few of them.
 
-        self.t = t.tolist()
-        self.p = p[:, permutations].swapaxes(0, 1)
+    If `reduce` is true, the Christoffel equation is solved only once for
+    every set of directions that are equivalent by the symmetry of the
+    material (see `calculations.do_reduced`). It is off by default, since
+    the few directions of every bisection are not worth folding.
+    """
+
+    def __init__(self, angle_samples=64, tolerance=2e-3, max_level=8, reduce=False):
+        self.t = np.linspace(0, 2 * np.pi, angle_samples, endpoint=False)
+        self.tolerance = tolerance
+        self.max_level = max_level
+        self.reduce = reduce
+        self.permutations = [[0, 1, 2], [0, 2, 1], [2, 0, 1]]
+        self.axes = [[0, 1], [0, 2], [1, 2]]  # in-plane coordinates
         self.planes = "XY", "XZ", "YZ"
 
-    def __call__(self, C, rho):
-        _, c, A = calculations.do(C, rho, self.p)
+    def __call__(self, C, rho, dtype=None):
+        return _to_lists(self.get_arrays(C, rho, dtype=dtype))
+
+    def get_arrays(self, C, rho, dtype=None):
+        """Return the same data as calling the object, with arrays instead of
+        lists.
+        """
+
+        return _merge(self.iter_arrays(C, rho, dtype=dtype))
+
+    def iter_arrays(self, C, rho, dtype=None):
+        """Yield the data of `get_arrays` in parts, one per plane, as soon as
+        every plane is calculated. Parts are nested dicts like the data, with
+        the items of a single plane.
+        """
+
+        kernel = calculations.get_kernel(C)
+        kwargs = {"solver": "cardano", "kernel": kernel, "group": True, "dtype": dtype}
+
+        for plane, permutation, axes in zip(self.planes, self.permutations, self.axes):
+            t, c, A, cg = self._sample(C, rho, permutation, axes, kwargs)
+
+            yield self._pack(plane, t, c, A, cg)
+
+    def get_stacked_arrays(self, C, rho, dtype=None):
+        """Return a list with the data of `get_arrays` of every material of a
+        stack of stiffness matrices `C`, with shape (M, 6, 6), and densities
+        `rho`, with shape (M,), calculated together in a single call of
+        `calculations.do` per plane.
+        Curves are sampled at the initial angles only, without bisections.
+        """
+
+        kernel = calculations.get_kernel(C)
+        kwargs = {"solver": "cardano", "kernel": kernel, "group": True, "dtype": dtype}
+        p = np.column_stack([np.cos(self.t), np.sin(self.t), np.zeros_like(self.t)])
+        parts = [[] for _ in range(len(C))]
+
+        for plane, permutation in zip(self.planes, self.permutations):
+            _, c, A, cg = calculations.do(C, rho, p[:, permutation], **kwargs)
+            for i, material_parts in enumerate(parts):
+                material_parts.append(self._pack(plane, self.t, c[i], A[i], cg[i]))
+
+        return [_merge(material_parts) for material_parts in parts]
+
+    def get_quantized(self, C, rho, dtype=None):
+        """Return the same data as `get_arrays` with quantized arrays (see
+        `transport.quantize`).
+        Angles and radii are 16-bit fixed point numbers of a turn and of the
+        maximum of every plot, respectively, delta encoded along the angles,
+        and polarizations are sent in thousandths, which they are rounded to.
+        """
+
+        return _merge(self.iter_quantized(C, rho, dtype=dtype))
+
+    def iter_quantized(self, C, rho, dtype=None):
+        """Yield the data of `get_quantized` in parts, like `iter_arrays`."""
+
+        for part in self.iter_arrays(C, rho, dtype=dtype):
+            yield self._quantize(part)
+
+    def _pack(self, plane, t, c, A, cg):
+        """Return the dict of arrays of the curves in the `plane` at the
+        angles `t`, with phase velocities `c`, polarizations `A` and group
+        velocities `cg`.
+        """
+
         m = 1e5 / c
-        cg = calculations.get_group_velocities(C, rho, self.p, c, A)
 
         if (np.isnan(c) | np.isinf(c)).any():
             c = np.zeros_like(c)
@@ -35,114 +172,1032 @@ class PolarPlot2D:
         if (np.isnan(cg) | np.isinf(cg)).any():
             cg = np.zeros_like(cg)
 
-        c_max = c.max(axis=2).max(axis=1)
-        m_max = m.max(axis=2).max(axis=1)
-        cg_max = np.linalg.norm(cg, axis=-2).max(axis=2).max(axis=1)
-
         A = A.swapaxes(-2, -1)
-        cg = cg.swapaxes(-2, -1)  # c[plane, t, A] => cg[plane, t, A, l]
-
-        data = {
-            "t": self.t,
-            "velocity": {"r": {}, "max": {}},
-            "slowness": {"r": {}, "max": {}},
-            "groupvelocity": {"r": {}, "max": {}},
-            "A": {},
+        cg = cg.swapaxes(-2, -1)  # c[t, A] => cg[t, A, l]
+
+        cg_max = np.linalg.norm(cg, axis=-1).max().item()
+
+        return {
+            "t": {plane: t},
+            "velocity": {"r": {plane: c}, "max": {plane: c.max().item()}},
+            "slowness": {"r": {plane: m}, "max": {plane: m.max().item()}},
+            "groupvelocity": {"r": {plane: cg}, "max": {plane: cg_max}},
+            "A": {plane: A.round(3)},
         }
-        for i, plane in enumerate(self.planes):
-            data["velocity"]["r"][plane] = c[i, ...].tolist()
-            data["velocity"]["max"][plane] = c_max[i]
-            data["slowness"]["r"][plane] = m[i, ...].tolist()
-            data["slowness"]["max"][plane] = m_max[i]
-            data["groupvelocity"]["r"][plane] = cg[i, ...].tolist()
-            data["groupvelocity"]["max"][plane] = cg_max[i].tolist()
-            data["A"][plane] = A[i, ...].round(3).tolist()
+
+    def _quantize(self, data):
+        """Quantize the arrays of the dict `data` of `get_arrays`, or of a
+        part of it, in place (see `get_quantized`) and return it.
+        """
+
+        for plane in data["t"]:
+            t = data["t"][plane]
+            data["t"][plane] = transport.quantize(t, 2 * np.pi / 2**16, delta=True)
+            for variable in "velocity", "slowness", "groupvelocity":
+                r = data[variable]["r"][plane]
+                scale = _get_fixed_point_scale(data[variable]["max"][plane])
+                data[variable]["r"][plane] = transport.quantize(r, scale, delta=True)
+            data["A"][plane] = transport.quantize(data["A"][plane], 1e-3)
 
         return data
 
+    def _evaluate(self, C, rho, t, permutation, kwargs):
+        """Return the results `c`, `A`, `cg` of `calculations.do` for the
+        angles `t` of the plane given by `permutation` of the axes.
+        """
+
+        p = np.column_stack([np.cos(t), np.sin(t), np.zeros_like(t)])
+        solve = calculations.do_reduced if self.reduce else calculations.do
+        _, c, A, cg = solve(C, rho, p[:, permutation], **kwargs)
+
+        return c, A, cg
+
+    def _get_points(self, t, c, cg, axes):
+        """Return the points of the velocity, slowness and group velocity
+        curves at the angles `t` in the plane with coordinates `axes`, as a
+        list of arrays with shape (angles, modes, 2).
+        """
+
+        u = np.column_stack([np.cos(t), np.sin(t)])[:, np.newaxis, :]
+
+        return [
+            c[..., np.newaxis] * u,
+            1e5 / c[..., np.newaxis] * u,
+            cg[:, axes, :].swapaxes(-2, -1),
+        ]
+
+    def _sample(self, C, rho, permutation, axes, kwargs):
+        """Sample the curves in the plane given by `permutation` and `axes`
+        adaptively. Return the angles `t` and the results `c`, `A`, `cg`.
+        """
+
+        t = self.t
+        c, A, cg = self._evaluate(C, rho, t, permutation, kwargs)
+        if not (c > 0).all():  # null curves of an invalid material
+            return t, c, A, cg
+
+        active = np.ones(len(t), dtype=bool)  # intervals that may be bisected
+        for _ in range(self.max_level):
+            # Midpoints of the active intervals [t[i], t[i + 1]]
+            i = np.flatnonzero(active)
+            j = (i + 1) % len(t)
+            mid_t = t[i] + (np.where(j > 0, t[j], 2 * np.pi) - t[i]) / 2
+            mid_c, mid_A, mid_cg = self._evaluate(C, rho, mid_t, permutation, kwargs)
+
+            # Distance from the curves to the midpoints of the segments
+            points = self._get_points(t, c, cg, axes)
+            mid_points = self._get_points(mid_t, mid_c, mid_cg, axes)
+            error = np.zeros(len(i))
+            for point, mid_point in zip(points, mid_points):
+                chord = (point[i] + point[j]) / 2
+                distance = np.linalg.norm(mid_point - chord, axis=-1).max(axis=-1)
+                radius = np.linalg.norm(point, axis=-1).max()
+                error = np.maximum(error, distance / radius)
+            split = error > self.tolerance
+            if not split.any():
+                break
+
+            # Insert the midpoints of the intervals that are bisected
+            t = np.concatenate([t, mid_t[split]])
+            c = np.concatenate([c, mid_c[split]])
+            A = np.concatenate([A, mid_A[split]])
+            cg = np.concatenate([cg, mid_cg[split]])
+            active = np.zeros(len(t), dtype=bool)
+            active[i[split]] = True
+            active[len(active) - split.sum() :] = True
+            order = np.argsort(t)
+            t, c, A, cg, active = t[order], c[order], A[order], cg[order], active[order]
+
+        return t, c, A, cg
+
 
 class SphericalPlot3D:
     """Data adapter for client-side plotting of surfaces.
     A number of angle samples is needed to construct an object of this class.
+    Optionally, the directions may be split among a number of `workers` of a
+    "thread" or "process" `pool` (see `calculations.do_parallel`).
+    If `reduce` is true, the Christoffel equation is solved only once for
+    every set of directions that are equivalent by the symmetry of the
+    material (see `calculations.do_reduced`), and the folding of the grid is
+    kept per symmetry. Only the directions of the grid are reduced, not the
+    midpoints of the refinements of `IcospherePlot3D`.
     Call the object to get the data from inputs
 
              `C`: stiffness matrix in GPa = 10⁹ N/m²
            `rho`: density in kg/m³
+         `dtype`: optional floating point type of the calculations
     """
 
-    def __init__(self, angle_samples):
-        u, v = np.meshgrid(
-            np.linspace(-np.pi, np.pi, angle_samples),
-            np.linspace(-np.pi / 2, np.pi / 2, angle_samples + 1)[::-1],
-        )
-        x, y, z = np.cos(u) * np.cos(v), np.sin(u) * np.cos(v), np.sin(v)
-        self.p = np.dstack([x, y, z])
+    def __init__(self, angle_samples, workers=None, pool="thread", reduce=True):
+        self.p, self.faces = _get_spherical_grid(angle_samples)
         self.angle_samples = angle_samples
+        self.workers = workers
+        self.pool = pool
+        self.reduce = reduce
+        self._grid_name = f"spherical-{angle_samples}"
+        self._foldings = {}
+
+    def __call__(self, C, rho, dtype=None):
+        return _to_lists(self.get_arrays(C, rho, dtype=dtype))
+
+    def get_arrays(self, C, rho, dtype=None):
+        """Return the same data as calling the object, with arrays instead of
+        lists.
+        """
+
+        return _merge(self.iter_arrays(C, rho, dtype=dtype))
+
+    def iter_arrays(self, C, rho, dtype=None):
+        """Yield the data of `get_arrays` in parts, one per surface, starting
+        with the phase velocity surface.
+        Parts are nested dicts like the data, with the items of a surface.
+        The phase velocity and slowness surfaces are yielded before the group
+        velocities are calculated.
+        """
+
+        c, A = self._evaluate(C, rho, self.p, dtype, group=False)
+        yield from self._iter_pack_phase(self.p, c)
+
+        if c.any():
+            operator = calculations.ChristoffelOperator(C, rho, dtype=c.dtype)
+            cg = operator.get_group_velocities(self.p, c, A)
+        else:  # null surfaces of an invalid material
+            cg = np.zeros_like(A)
+        yield self._pack_group(cg)
+
+    def get_faces(self, quantized=False):
+        """Return the vector of vertex indices of the triangles of the
+        surfaces, which are the same for every material and are not part of
+        their data. If `quantized` is true, indices are 16-bit if there are
+        few vertices.
+        """
+
+        faces = self.faces.ravel()
+        if quantized and len(self.p) <= 2**16:
+            faces = faces.astype(np.uint16)
+
+        return faces
+
+    def get_quantized(self, C, rho, dtype=None):
+        """Return the same data as `get_arrays` with quantized arrays (see
+        `transport.quantize`).
+        Coordinates of vertices, which are scaled to 10, are 16-bit fixed
+        point numbers, and faces, if they are part of the data, are 16-bit
+        indices if there are few vertices.
+        """
+
+        return _merge(self.iter_quantized(C, rho, dtype=dtype))
+
+    def iter_quantized(self, C, rho, dtype=None):
+        """Yield the data of `get_quantized` in parts, like `iter_arrays`."""
+
+        for part in self.iter_arrays(C, rho, dtype=dtype):
+            yield self._quantize(part)
+
+    def get_stacked_arrays(self, C, rho, dtype=None):
+        """Return a list with the data of `get_arrays` of every material of a
+        stack of stiffness matrices `C`, with shape (M, 6, 6), and densities
+        `rho`, with shape (M,), calculated together in a single call of
+        `calculations.do`.
+        Surfaces have the vertices of the grid of the object, without any
+        refinement.
+        """
+
+        kwargs = {"solver": "cardano", "kernel": "auto", "group": True, "dtype": dtype}
+        _, c, _, cg = calculations.do(C, rho, self.p, **kwargs)
+
+        return [_merge(self._iter_pack(self.p, c[i], cg[i])) for i in range(len(C))]
+
+    def _quantize(self, data):
+        """Quantize the arrays of the dict `data` of `get_arrays`, or of a
+        part of it, in place (see `get_quantized`) and return it.
+        """
+
+        scale = _get_fixed_point_scale(10)
+        for surface in data.keys() - {"faces"}:
+            vertices = data[surface]["vertices"]
+            if "faces" in data and vertices.shape[-1] // 3 <= 2**16:
+                data["faces"] = data["faces"].astype(np.uint16)
+            data[surface]["vertices"] = transport.quantize(vertices, scale)
+
+        return data
+
+    def _evaluate(self, C, rho, p, dtype, group=True):
+        """Return the phase velocities `c` and group velocities `cg` in the
+        directions `p`, or `c` and the polarizations `A` if `group` is false.
+        """
+
+        kwargs = {"solver": "cardano", "kernel": "auto", "group": group, "dtype": dtype}
+        if self.workers is None:
+            solve = calculations.do
+        else:
+            solve = functools.partial(
+                calculations.do_parallel, workers=self.workers, pool=self.pool
+            )
+
+        # Folding other directions, like the midpoints of the edges of a
+        # refinement, costs more than it saves
+        if self.reduce and p is self.p:
+            folding = self._get_folding(C)
+            results = calculations.do_reduced(
+                C, rho, p, solve=solve, folding=folding, **kwargs
+            )
+        else:
+            results = solve(C, rho, p, **kwargs)
+
+        return results[1], results[-1]
+
+    def _get_folding(self, C):
+        """Return the folding of the directions of the grid by the symmetry of
+        `C` (see `calculations.fold_directions`), which is kept per symmetry
+        and in cache files of `GRIDS_PATH`, like the grid.
+        """
+
+        symmetry = calculations.get_symmetry(C)
+        if symmetry not in self._foldings:
+            prefix = os.path.join(
+                GRIDS_PATH, f"{self._grid_name}-{symmetry.name.lower()}"
+            )
+            self._foldings[symmetry] = _load_grid(
+                prefix,
+                ("n", "R", "inverse"),
+                functools.partial(calculations.fold_directions, self.p, symmetry),
+            )
+
+        return self._foldings[symmetry]
+
+    def _iter_pack(self, p, c, cg, faces=None):
+        """Yield the dicts of arrays of the surfaces with vertices in the
+        directions `p`, phase velocities `c` and group velocities `cg`, one
+        per surface. The triangles `faces` are added to the first one if they
+        are given.
+        """
+
+        yield from self._iter_pack_phase(p, c, faces)
+        yield self._pack_group(cg)
+
+    def _iter_pack_phase(self, p, c, faces=None):
+        """Yield the dicts of arrays of the phase velocity and slowness
+        surfaces, like `_iter_pack`.
+        """
 
-    def __call__(self, C, rho):
-        # Calculate surface points
-        _, c, A = calculations.do(C, rho, self.p)
         m = 1e5 / c
-        cg = 1e6 * calculations.get_group_velocities(C, rho, self.p, c, A)
 
         # Turn invalid surfaces into null
         if (np.isnan(c) | np.isinf(c)).any():
             c = np.zeros_like(c)
         if (np.isnan(m) | np.isinf(m)).any():
             m = np.zeros_like(m)
+
+        # Make arrays compatible with OpenGL vertex streams, and scale their
+        # values to avoid depth-related visual issues
+        p = p[np.newaxis, ...].astype(c.dtype)
+        c = c.T[..., np.newaxis]
+        c_max = c.max().item()
+        c_vertices = (c * p).reshape(c.shape[0], -1) * _get_plot_scale(c_max)
+        part = {"velocity": {"vertices": c_vertices, "max": c_max}}
+        if faces is not None:
+            part["faces"] = faces.ravel()
+        yield part
+
+        m = m.T[..., np.newaxis]
+        m_max = m.max().item()
+        m_vertices = (m * p).reshape(m.shape[0], -1) * _get_plot_scale(m_max)
+        yield {"slowness": {"vertices": m_vertices, "max": m_max}}
+
+    def _pack_group(self, cg):
+        """Return the dict of arrays of the group velocity surface, like
+        `_iter_pack`.
+        """
+
+        cg = 1e6 * cg
+
+        # Turn invalid surfaces into null
         if (np.isnan(cg) | np.isinf(cg)).any():
             cg = np.zeros_like(cg)
 
-        # Make arrays compatible with OpenGL vertex streams
-        p = self.p[np.newaxis, ...]
-        c = c.transpose(2, 0, 1)[..., np.newaxis]
-        c_vertices = (c * p).reshape(c.shape[0], -1)
-        c_max = c.max()
-        m = m.transpose(2, 0, 1)[..., np.newaxis]
-        m_vertices = (m * p).reshape(m.shape[0], -1)
-        m_max = m.max()
-        cg = cg.transpose(3, 0, 1, 2)
-        cg_vertices = cg.reshape(cg.shape[0], -1)
-        cg_max = cg.max()
-        n = self.angle_samples
-        faces = (
-            np.r_[
-                (np.c_[:n] + np.r_[0, 0, 1]) % n + np.r_[0, n, 0],
-                (np.c_[:n] - np.r_[0, 0, 1]) % n + np.r_[0, n, n],
-            ]
-            + np.c_[: (n - 1) * n : n][..., np.newaxis]
-        ).ravel()
-
-        # Scale array values to avoid depth-related visual issues
-        c_vertices *= 10 / c_max
-        m_vertices *= 10 / m_max
-        cg_vertices *= 10 / cg_max
-
-        # Pack data in a JSON-compatible dictionary
-        return {
-            "velocity": {"vertices": c_vertices.tolist(), "max": c_max},
-            "slowness": {"vertices": m_vertices.tolist(), "max": m_max},
-            "groupvelocity": {
-                "vertices": cg_vertices.tolist(),
-                "max": cg_max,
-            },
-            "faces": faces.tolist(),
-        }
+        cg = cg.transpose(2, 0, 1)
+        cg_max = cg.max().item()
+        cg_vertices = cg.reshape(cg.shape[0], -1) * _get_plot_scale(cg_max)
+        return {"groupvelocity": {"vertices": cg_vertices, "max": cg_max}}
+
+
+def _get_edges(faces):
+    """Return a tuple `edges`, `face_edges` for the triangles `faces` of a
+    mesh, where `edges` has the pair of vertices of every edge and
+    `face_edges` has the index of the edge between the vertices `k` and
+    `k + 1` of every triangle in its column `k`.
+    """
+
+    a, b = faces.astype(np.int64), np.roll(faces, -1, axis=1)
+    keys, face_edges = np.unique(_get_edge_keys(a, b), return_inverse=True)
+    edges = np.column_stack([keys >> 32, keys & 0xFFFFFFFF]).astype(faces.dtype)
+
+    return edges, face_edges.reshape(-1, 3)
+
+
+def _get_edge_keys(a, b):
+    """Return the int64 keys of the edges between the vertices `a` and `b`,
+    which sort like the pairs of their vertices in ascending order.
+    """
+
+    a, b = np.minimum(a, b).astype(np.int64), np.maximum(a, b).astype(np.int64)
+
+    return a << 32 | b
+
+
+def _split_faces(faces, face_edges, marked, size):
+    """Split the triangles `faces` of a mesh with `size` vertices at the
+    midpoints of the `marked` edges (see `_get_edges`), numbered from `size`
+    in the order of the edges.
+
+    Triangles with three marked edges are split in four and triangles with
+    one of them are split in two.
+    Triangles with two marked edges get the third one marked too, so that
+    the mesh has no hanging vertices.
+    Return a tuple with the new triangles and the marked edges.
+    """
+
+    marked = marked.copy()
+    counts = marked[face_edges].sum(axis=1)
+    while (counts == 2).any():
+        marked[face_edges[counts == 2]] = True
+        counts = marked[face_edges].sum(axis=1)
+
+    midpoints = (size + np.cumsum(marked) - 1)[face_edges]
+    a, b, c = faces[counts == 3].T
+    ab, bc, ca = midpoints[counts == 3].T
+
+    # Rotate triangles with one marked edge so that it is the first one
+    rows = np.argmax(marked[face_edges[counts == 1]], axis=1)[:, np.newaxis]
+    rotation = (rows + np.arange(3)) % 3
+    d, e, f = np.take_along_axis(faces[counts == 1], rotation, axis=1).T
+    de = np.take_along_axis(midpoints[counts == 1], rotation, axis=1)[:, 0]
+
+    new_faces = np.concatenate(
+        [
+            faces[counts == 0],
+            np.column_stack([a, ab, ca]),
+            np.column_stack([ab, b, bc]),
+            np.column_stack([ca, bc, c]),
+            np.column_stack([ab, bc, ca]),
+            np.column_stack([d, de, f]),
+            np.column_stack([de, e, f]),
+        ]
+    )
+
+    return new_faces, marked
+
+
+def _get_midpoints(p, edges):
+    """Return the unit directions halfway along the `edges` between the unit
+    directions `p`.
+    """
+
+    midpoints = p[edges[:, 0]] + p[edges[:, 1]]
+
+    return midpoints / np.linalg.norm(midpoints, axis=-1, keepdims=True)
+
 
+# Directory of the cache files of the sampling grids, which are written the
+# first time that a grid is needed. Delete it if the grids change.
+GRIDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grids")
+
+
+@functools.cache
+def _get_spherical_grid(angle_samples):
+    """Return a tuple `p`, `faces` with the unit directions and the triangles
+    of a latitude-longitude grid with `angle_samples` longitudes and
+    `angle_samples + 1` latitudes, read from cache files of `GRIDS_PATH`
+    (see `_load_grid`).
+    """
+
+    prefix = os.path.join(GRIDS_PATH, f"spherical-{angle_samples}")
+
+    return _load_grid(
+        prefix, ("p", "faces"), functools.partial(_build_spherical_grid, angle_samples)
+    )
+
+
+def _build_spherical_grid(angle_samples):
+    """Return the arrays of `_get_spherical_grid`, calculating them."""
+
+    u, v = np.meshgrid(
+        np.linspace(-np.pi, np.pi, angle_samples),
+        np.linspace(-np.pi / 2, np.pi / 2, angle_samples + 1)[::-1],
+    )
+    x, y, z = np.cos(u) * np.cos(v), np.sin(u) * np.cos(v), np.sin(v)
+    p = np.dstack([x, y, z]).reshape(-1, 3)
+    n = angle_samples
+    faces = (
+        np.r_[
+            (np.c_[:n] + np.r_[0, 0, 1]) % n + np.r_[0, n, 0],
+            (np.c_[:n] - np.r_[0, 0, 1]) % n + np.r_[0, n, n],
+        ]
+        + np.c_[: (n - 1) * n : n][..., np.newaxis]
+    ).reshape(-1, 3)
+
+    return p, faces
+
+
+@functools.cache
+def _get_icosphere(subdivisions):
+    """Return a tuple `p`, `faces` with the unit vertices and the triangles
+    of an icosahedron whose edges are halved `subdivisions` times, with the
+    new vertices projected onto the unit sphere, read from cache files of
+    `GRIDS_PATH` (see `_load_grid`).
+    """
+
+    prefix = os.path.join(GRIDS_PATH, f"icosphere-{subdivisions}")
+
+    return _load_grid(
+        prefix, ("p", "faces"), functools.partial(_build_icosphere, subdivisions)
+    )
+
+
+def _load_grid(prefix, names, build):
+    """Return a tuple with the arrays `names` of a sampling grid, read from
+    the cache files `prefix` followed by their names, or returned by `build`
+    and written to them if they are missing. They are shared by every
+    caller, so they are read-only.
+    """
 
-_polar_plot_2d = PolarPlot2D()
-_spherical_plot_3d = SphericalPlot3D(angle_samples=40)
+    try:
+        arrays = tuple(np.load(f"{prefix}-{name}.npy") for name in names)
+    except (OSError, ValueError):
+        arrays = tuple(build())
+        _write_grid(prefix, **dict(zip(names, arrays)))
+    for array in arrays:
+        array.flags.writeable = False
 
+    return arrays
 
-def get_velocity_curves(C, rho):
+
+def _write_grid(prefix, **arrays):
+    """Write the `arrays` of a sampling grid to the cache files `prefix`
+    followed by their names, unless their directory cannot be written.
+    Files are .npy rather than .npz, which are read without importing
+    `zipfile`.
+    """
+
+    try:
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        for name, array in arrays.items():
+            # Write a temporary file first, so that a file is whole or missing
+            filename = f"{prefix}-{name}.npy"
+            temporary_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}"
+            with open(temporary_filename, "wb") as file:
+                np.save(file, array)
+            os.replace(temporary_filename, filename)
+    except OSError:
+        pass
+
+
+def _build_icosphere(subdivisions):
+    """Return the arrays of `_get_icosphere`, calculating them."""
+
+    g = (1 + 5**0.5) / 2  # golden ratio
+    p = np.array(
+        [
+            [-1, g, 0],
+            [1, g, 0],
+            [-1, -g, 0],
+            [1, -g, 0],
+            [0, -1, g],
+            [0, 1, g],
+            [0, -1, -g],
+            [0, 1, -g],
+            [g, 0, -1],
+            [g, 0, 1],
+            [-g, 0, -1],
+            [-g, 0, 1],
+        ]
+    ) / np.hypot(1, g)
+    faces = np.array(
+        [
+            [0, 11, 5],
+            [0, 5, 1],
+            [0, 1, 7],
+            [0, 7, 10],
+            [0, 10, 11],
+            [1, 5, 9],
+            [5, 11, 4],
+            [11, 10, 2],
+            [10, 7, 6],
+            [7, 1, 8],
+            [3, 9, 4],
+            [3, 4, 2],
+            [3, 2, 6],
+            [3, 6, 8],
+            [3, 8, 9],
+            [4, 9, 5],
+            [2, 4, 11],
+            [6, 2, 10],
+            [8, 6, 7],
+            [9, 8, 1],
+        ]
+    )
+
+    for _ in range(subdivisions):
+        edges, face_edges = _get_edges(faces)
+        marked = np.ones(len(edges), dtype=bool)
+        faces, _ = _split_faces(faces, face_edges, marked, len(p))
+        p = np.concatenate([p, _get_midpoints(p, edges)])
+
+    return p, faces
+
+
+class IcospherePlot3D(SphericalPlot3D):
+    """Data adapter for client-side plotting of surfaces, like
+    `SphericalPlot3D`, whose directions are the vertices of an icosahedron
+    subdivided `subdivisions` times.
+    Unlike a latitude-longitude grid, it has no repeated vertices at the
+    poles or the seam, and the vertices are spread almost uniformly.
+
+    If `max_level` is positive, the mesh is refined for every material.
+    Edges are halved while the surfaces deviate from the straight segment
+    between their ends by more than `tolerance` times the size of the
+    surface, at most `max_level` times, so that the surfaces get more
+    vertices only around cusps and acoustic axes. Then the faces of the
+    refined mesh are part of the data of every material, as "faces".
+    """
+
+    def __init__(
+        self,
+        subdivisions=3,
+        max_level=0,
+        tolerance=2e-2,
+        workers=None,
+        pool="thread",
+        reduce=True,
+    ):
+        self.p, self.faces = _get_icosphere(subdivisions)
+        self.subdivisions = subdivisions
+        self.max_level = max_level
+        self.tolerance = tolerance
+        self.workers = workers
+        self.pool = pool
+        self.reduce = reduce
+        self._grid_name = f"icosphere-{subdivisions}"
+        self._foldings = {}
+
+    def iter_arrays(self, C, rho, dtype=None):
+        p, faces = self.p, self.faces
+        c, cg = self._evaluate(C, rho, p, dtype)
+        if not self.max_level or not (c > 0).all():  # not refined
+            yield from self._iter_pack(p, c, cg, faces if self.max_level else None)
+            return
+
+        # Midpoints of the edges of the previous level, which are kept by the
+        # edges that were not split, so that only new edges are evaluated
+        known_keys = np.empty(0, dtype=np.int64)
+        known = None
+
+        for _ in range(self.max_level):
+            edges, face_edges = _get_edges(faces)
+            keys = _get_edge_keys(edges[:, 0], edges[:, 1])
+            positions = np.searchsorted(known_keys, keys)
+            found = positions < len(known_keys)
+            found[found] = known_keys[positions[found]] == keys[found]
+
+            points = self._get_points(p, c, cg)
+            new = self._evaluate_edges(C, rho, points, p, edges[~found], dtype)
+            if known is None:
+                midpoints = new
+            else:
+                midpoints = []
+                for new_array, known_array in zip(new, known):
+                    array = np.empty((len(edges), *new_array.shape[1:]))
+                    array = array.astype(new_array.dtype)
+                    array[~found] = new_array
+                    array[found] = known_array[positions[found]]
+                    midpoints.append(array)
+            mid_p, mid_c, mid_cg, distance = midpoints
+            known_keys, known = keys, midpoints
+
+            # Distance relative to the size of every surface
+            radius = [np.linalg.norm(point, axis=-1).max() for point in points]
+            error = (distance / radius).max(axis=-1)
+            if not (error > self.tolerance).any():
+                break
+
+            faces, marked = _split_faces(
+                faces, face_edges, error > self.tolerance, len(p)
+            )
+            p = np.concatenate([p, mid_p[marked]])
+            c = np.concatenate([c, mid_c[marked]])
+            cg = np.concatenate([cg, mid_cg[marked]])
+
+        yield from self._iter_pack(p, c, cg, faces)
+
+    def _evaluate_edges(self, C, rho, points, p, edges, dtype):
+        """Return a tuple `mid_p`, `mid_c`, `mid_cg`, `distance` with the
+        midpoints of the `edges` between the directions `p`, their phase and
+        group velocities, and the distances from every surface to the
+        midpoints of the straight segments of the edges, with shape
+        (edges, surfaces). `points` are the points of the surfaces in the
+        directions `p` (see `_get_points`).
+        """
+
+        mid_p = _get_midpoints(p, edges)
+        mid_c, mid_cg = self._evaluate(C, rho, mid_p, dtype)
+
+        mid_points = self._get_points(mid_p, mid_c, mid_cg)
+        distance = np.empty((len(edges), len(points)))
+        for k, (point, mid_point) in enumerate(zip(points, mid_points)):
+            chord = (point[edges[:, 0]] + point[edges[:, 1]]) / 2
+            distance[:, k] = np.linalg.norm(mid_point - chord, axis=-1).max(axis=-1)
+
+        return mid_p, mid_c, mid_cg, distance
+
+    def _get_points(self, p, c, cg):
+        """Return the points of the velocity, slowness and group velocity
+        surfaces in the directions `p`, as a list of arrays with shape
+        (directions, modes, 3).
+        """
+
+        p = p[:, np.newaxis, :]
+
+        return [
+            c[..., np.newaxis] * p,
+            1e5 / c[..., np.newaxis] * p,
+            cg.swapaxes(-2, -1),
+        ]
+
+
+class ResultCache:
+    """Bounded cache of the data of a plot `adapter`, like `PolarPlot2D`.
+    Call the object like the adapter to get the data of a material from the
+    cache, or from the adapter if it is not there.
+
+    Results are keyed by a hash of `C` and `rho` rounded to `decimals`
+    decimal places, the floating point type and the configuration of the
+    adapter, which is read in every call.
+    When there are more than `maxsize` results, or they take more than
+    `maxbytes` bytes, the least recently used results are evicted.
+    The results are kept and returned in the given `format`:
+          `None`: dict of the adapter, whose size is that of its JSON text
+          "json": JSON text of the dict, ready to be sent in a response body
+        "arrays": dict with arrays instead of lists (see `get_arrays` of the
+                  adapters), ready to be encoded by `transport.encode`
+     "quantized": dict with quantized arrays (see `get_quantized` of the
+                  adapters), ready to be encoded by `transport.encode`
+    Returned dicts are shared by every call, so they must not be modified.
+    Results may also be calculated and returned in parts with `iter`.
+
+    Calls from several threads for the same results, while they are being
+    calculated, wait for that calculation instead of repeating it.
+    The adapter runs in the `executor`, like a `ProcessPoolExecutor`, if it
+    is given (see `set_executor`), so that calculations do not hold the GIL
+    of the threads that serve requests.
+
+    The numbers of calls that found or missed their results are counted in
+    `hits` and `misses`, and those that waited for another call in
+    `coalesced`.
+    """
+
+    def __init__(
+        self,
+        adapter,
+        maxsize=64,
+        maxbytes=None,
+        decimals=9,
+        format=None,
+        executor=None,
+    ):
+        self.adapter = adapter
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.decimals = decimals
+        self.format = format
+        self.executor = executor
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.nbytes = 0
+        self._results = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, C, rho, dtype=None):
+        key = self._get_key(C, rho, dtype)
+        result, future = self._find(key)
+        if future is None:
+            return result
+
+        try:
+            method = "get_quantized" if self.format == "quantized" else "get_arrays"
+            data = self._calculate(method, C, rho, dtype)
+            if self.format in (None, "json"):
+                data = _to_lists(data)
+            result = self._put(key, data)
+            self._resolve(key, future, result)
+        except Exception as error:
+            self._resolve(key, future, error=error)
+            raise
+        finally:
+            if not future.done():
+                self._resolve(key, future)
+
+        return result
+
+    def iter(self, C, rho, dtype=None):
+        """Yield the results of calling the object in parts, as soon as they
+        are calculated by the adapter (see `iter_arrays` of the adapters), or
+        whole if they are in the cache. Parts are nested dicts, or their JSON
+        texts in the "json" format, that are merged into the results.
+        With an executor, results are calculated there and yielded whole.
+
+        Parts are calculated in a thread of their own, and the results are
+        kept as soon as the last part is calculated, so that calls that wait
+        for them do not wait for the parts to be consumed, like a slow client
+        downloading a response. The results are calculated and kept even if
+        the generator is closed before the end.
+        """
+
+        if self.executor is not None:
+            yield self(C, rho, dtype=dtype)
+            return
+
+        key = self._get_key(C, rho, dtype)
+        result, future = self._find(key)
+        if future is None:
+            yield result
+            return
+
+        parts = queue.SimpleQueue()
+        threading.Thread(
+            target=self._produce, args=(key, future, C, rho, dtype, parts)
+        ).start()
+        while (part := parts.get()) is not None:
+            if isinstance(part, Exception):
+                raise part
+            yield part
+
+    def _produce(self, key, future, C, rho, dtype, parts):
+        """Calculate the results of `key` in parts (see `iter`), putting them
+        in the queue `parts` followed by `None`, or followed by the error of
+        the calculation, and then resolve the `future` of the results.
+        """
+
+        method = "iter_quantized" if self.format == "quantized" else "iter_arrays"
+        try:
+            data = {}
+            for part in getattr(self.adapter, method)(C, rho, dtype=dtype):
+                if self.format in (None, "json"):
+                    part = _to_lists(part)
+                _update(data, part)
+                parts.put(json.dumps(part) if self.format == "json" else part)
+            self._resolve(key, future, self._put(key, data))
+        except Exception as error:  # noqa: BLE001, raised by `iter`
+            self._resolve(key, future, error=error)
+            parts.put(error)
+        finally:
+            parts.put(None)
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        """Remove every result and reset the counters."""
+
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = self.coalesced = self.nbytes = 0
+
+    def _find(self, key):
+        """Return a pair with the results of `key` and `None` if they are in
+        the cache or they are calculated by another call, which is waited
+        for. Otherwise, return `None` and a future of the results, which the
+        caller must calculate and then pass to `_resolve`.
+        """
+
+        while True:
+            with self._lock:
+                if key in self._results:
+                    return self._get(key), None
+                future = self._pending.get(key)
+                if future is None:
+                    self.misses += 1
+                    self._pending[key] = Future()
+                    return None, self._pending[key]
+                self.coalesced += 1
+            try:
+                return future.result(), None
+            except CancelledError:
+                pass  # the other call gave up, so calculate the results here
+
+    def _resolve(self, key, future, result=None, error=None):
+        """Set the `result` or the `error` of the `future` of the results of
+        `key`, which are no longer pending, or cancel it if there are none.
+        """
+
+        with self._lock:
+            del self._pending[key]
+        if error is not None:
+            future.set_exception(error)
+        elif result is not None:
+            future.set_result(result)
+        else:
+            future.cancel()
+
+    def _calculate(self, method, C, rho, dtype):
+        """Return the data of the `method` of the adapter, calculated in the
+        executor if there is one.
+        """
+
+        if self.executor is None:
+            return getattr(self.adapter, method)(C, rho, dtype=dtype)
+
+        future = self.executor.submit(
+            _call_adapter, self.adapter, method, C, rho, dtype
+        )
+
+        return future.result()
+
+    def _get(self, key):
+        """Return the results of `key`, which are in the cache."""
+
+        self.hits += 1
+        self._results.move_to_end(key)
+
+        return self._results[key][0]
+
+    def _put(self, key, data):
+        """Keep the `data` of the adapter as the results of `key` and return
+        them.
+        """
+
+        if self.format in ("arrays", "quantized"):
+            result = data
+            nbytes = _get_nbytes(data)
+        else:
+            text = json.dumps(data) if self.format or self.maxbytes else ""
+            result = text if self.format == "json" else data
+            nbytes = len(text)
+
+        with self._lock:
+            self._results[key] = result, nbytes
+            self.nbytes += nbytes
+            while len(self._results) > self.maxsize or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes
+            ):
+                _, (_, nbytes) = self._results.popitem(last=False)
+                self.nbytes -= nbytes
+
+        return result
+
+    def _get_key(self, C, rho, dtype):
+        """Return the key of the results of the adapter for the material with
+        stiffness matrix `C` and density `rho`, and floating point type
+        `dtype`.
+        """
+
+        digest = hashlib.sha1()
+        digest.update(np.round(np.asarray(C, dtype=float), self.decimals) + 0.0)
+        digest.update(np.round(np.asarray(rho, dtype=float), self.decimals) + 0.0)
+        digest.update(calculations._get_dtype(dtype).str.encode())
+        _update_digest(digest, self.adapter)
+
+        return digest.digest()
+
+
+def _get_plot_scale(maximum):
+    """Return the factor that scales values up to `maximum` to 10, or zero
+    for the null surfaces of invalid materials.
+    """
+
+    return 10 / maximum if maximum > 0 else 0.0
+
+
+def _get_fixed_point_scale(maximum):
+    """Return the scale of 16-bit fixed point numbers up to `maximum`."""
+
+    return maximum / (2**15 - 1) if maximum > 0 else 1.0
+
+
+def _get_nbytes(data):
+    """Return the number of bytes of the arrays of the nested dicts `data`."""
+
+    if isinstance(data, dict):
+        return sum(_get_nbytes(value) for value in data.values())
+
+    return np.asarray(data).nbytes
+
+
+def _update_digest(digest, adapter):
+    """Update the hash object `digest` with the configuration of the plot
+    `adapter`, given by its public attributes.
+    """
+
+    for name, value in sorted(vars(adapter).items()):
+        if name.startswith("_"):
+            continue
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray):
+            digest.update(np.ascontiguousarray(value))
+        else:
+            digest.update(repr(value).encode())
+
+
+# Copies of adapters in a process of a pool, by configuration
+_adapters = {}
+
+
+def _call_adapter(adapter, method, C, rho, dtype):
+    """Return the data of the `method` of the plot `adapter` in a process of
+    a pool. The copy of the adapter of earlier calls with the same
+    configuration is used instead, so that its own caches are kept.
+    """
+
+    digest = hashlib.sha1(type(adapter).__qualname__.encode())
+    _update_digest(digest, adapter)
+    adapter = _adapters.setdefault(digest.digest(), adapter)
+
+    return getattr(adapter, method)(C, rho, dtype=dtype)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_stacked_adapters(resolution):
+    """Return a dict with the kinds of plots and their adapters for
+    `get_stacked_plot_data` with the given `resolution`.
+    """
+
+    subdivisions = max(0, round(np.log2(resolution / 8)))
+
+    return {
+        "curves": PolarPlot2D(angle_samples=resolution, max_level=0),
+        "surfaces": IcospherePlot3D(subdivisions=subdivisions, max_level=0),
+    }
+
+
+# Materials times directions that are calculated together
+_STACK_DIRECTIONS = 2**18
+
+
+@functools.cache
+def _get_adapter(kind):
+    """Return the adapter of the "curves" or "surfaces" plots of a material,
+    according to `kind`, which is built the first time that it is needed.
+    """
+
+    if kind == "curves":
+        return PolarPlot2D()
+
+    return SphericalPlot3D(angle_samples=40)
+
+
+# Caches of the plot data by kind and format, built when first needed
+_caches = {}
+_caches_lock = threading.Lock()
+_MAXBYTES = {"curves": 2**26, "surfaces": 2**27}
+_executor = None
+
+
+def _get_cache(kind, format):
+    """Return the `ResultCache` of the `kind` of plot data in the `format`."""
+
+    with _caches_lock:
+        if (kind, format) not in _caches:
+            _caches[kind, format] = ResultCache(
+                _get_adapter(kind),
+                maxbytes=_MAXBYTES[kind],
+                format=format,
+                executor=_executor,
+            )
+
+        return _caches[kind, format]
+
+
+def set_executor(executor):
+    """Calculate the data of `get_velocity_curves`, `get_velocity_surfaces`
+    and their `iter_` functions in `executor`, like a `ProcessPoolExecutor`,
+    or in the calling threads if it is `None` (see `ResultCache`).
+    """
+
+    global _executor
+
+    with _caches_lock:
+        _executor = executor
+        for cache in _caches.values():
+            cache.executor = executor
+
+
+def get_velocity_curves(C, rho, dtype=None, format=None):
     """Generate data to plot velocity curves from the following inputs.
 
              `C`: stiffness matrix in GPa = 10⁹ N/m²
            `rho`: density in kg/m³
+         `dtype`: floating point type of the calculations, by default
+                  `calculations.default_dtype`
+        `format`: optional format of the dict, "json" for its JSON text,
+                  "arrays" for arrays instead of lists or "quantized" for
+                  quantized arrays (see `ResultCache`)
 
      Return a JSON-serializable dict with the following information.
 
-                `t`: vector of angles in radians sampling a complete turn
+                `t`: dict with a vector of angles in radians sampling a
+                     complete turn per plane, not necessarily equally spaced
          `velocity`: dict with phase velocity data
                        `r`: matrix with velocity curves
                      `max`: maximum velocity value for scaling plots
@@ -153,16 +1208,23 @@ def get_velocity_curves(C, rho):
                        `r`: matrix with group velocity curves
                      `max`: maximum group velocity norm for scaling plots
                 `A`: matrix with normalized polarization vectors per column
+
+    Results of recent materials are kept in a cache (see `ResultCache`).
     """
 
-    return _polar_plot_2d(C, rho)
+    return _get_cache("curves", format)(C, rho, dtype=dtype)
 
 
-def get_velocity_surfaces(C, rho):
+def get_velocity_surfaces(C, rho, dtype=None, format=None):
     """Generate data to plot surface curves from the following inputs.
 
              `C`: stiffness matrix in GPa = 10⁹ N/m²
            `rho`: density in kg/m³
+         `dtype`: floating point type of the calculations, by default
+                  `calculations.default_dtype`
+        `format`: optional format of the dict, "json" for its JSON text,
+                  "arrays" for arrays instead of lists or "quantized" for
+                  quantized arrays (see `ResultCache`)
 
      Return a JSON-serializable dict with the following information.
 
@@ -175,7 +1237,82 @@ def get_velocity_surfaces(C, rho):
     `groupvelocity`: dict with group velocity data
                      `vertices`: vertices of the group velocity surface
                           `max`: maximum slowness value for scaling plots
+
+    The faces of the surfaces are the same for every material, so they are
+    given by `get_surface_faces`.
+    Results of recent materials are kept in a cache (see `ResultCache`).
+    """
+
+    return _get_cache("surfaces", format)(C, rho, dtype=dtype)
+
+
+@functools.lru_cache(maxsize=8)
+def get_surface_faces(format=None, resolution=None):
+    """Return a JSON-serializable dict with the faces of the surfaces of
+    `get_velocity_surfaces`, or of `get_stacked_plot_data` with the given
+    `resolution`, which are the same for every material.
+
             `faces`: list of vertex indices for each face
+
+    `format` is like the one of `get_velocity_surfaces`. In the "quantized"
+    format, indices are 16-bit if there are few vertices.
+    The dict is shared by every call, so it must not be modified.
+    """
+
+    if resolution is None:
+        adapter = _get_adapter("surfaces")
+    else:
+        adapter = _get_stacked_adapters(resolution)["surfaces"]
+
+    data = {"faces": adapter.get_faces(quantized=format == "quantized")}
+    if format in (None, "json"):
+        data = _to_lists(data)
+
+    return json.dumps(data) if format == "json" else data
+
+
+def get_stacked_plot_data(kind, C, rho, resolution=64, dtype=None, format=None):
+    """Return a list with the "curves" or "surfaces" data, according to
+    `kind`, of every material of a stack of stiffness matrices `C`, with
+    shape (M, 6, 6), and densities `rho`, with shape (M,), in the `format`
+    `None`, "arrays" or "quantized" (see `ResultCache`).
+
+    Materials are calculated together, in as few calls of `calculations.do`
+    as the memory allows, at fixed directions: curves are sampled at
+    `resolution` angles per plane, and surfaces at the vertices of an
+    icosahedron that is subdivided about log2(`resolution` / 8) times,
+    without refinement, whose faces are given by `get_surface_faces`.
+    Data are not cached.
+    """
+
+    adapter = _get_stacked_adapters(resolution)[kind]
+    size = len(adapter.t) * 3 if kind == "curves" else len(adapter.p)
+    step = max(1, _STACK_DIRECTIONS // size)
+
+    data = []
+    for start in range(0, len(C), step):
+        stop = start + step
+        data += adapter.get_stacked_arrays(C[start:stop], rho[start:stop], dtype)
+
+    if format == "quantized":
+        return [adapter._quantize(item) for item in data]
+    if format is None:
+        return [_to_lists(item) for item in data]
+
+    return data
+
+
+def iter_velocity_curves(C, rho, dtype=None, format=None):
+    """Yield the data of `get_velocity_curves` in parts, one per plane, as
+    soon as every plane is calculated (see `ResultCache.iter`).
+    """
+
+    return _get_cache("curves", format).iter(C, rho, dtype=dtype)
+
+
+def iter_velocity_surfaces(C, rho, dtype=None, format=None):
+    """Yield the data of `get_velocity_surfaces` in parts, one per surface,
+    starting with the phase velocity surface (see `ResultCache.iter`).
     """
 
-    return _spherical_plot_3d(C, rho)
+    return _get_cache("surfaces", format).iter(C, rho, dtype=dtype)
@@ -0,0 +1,171 @@
+"""Offline store of the plot data of the predefined materials.
+
+Build it from the `src` directory with
+
+    python -m precomputed
+
+so that the data of every material in `material.CONSTANTS` is served without
+calculations. The store is a directory named after its version, with one file
+per kind of plot and format, with the JSON text or the body of the quantized
+binary transport of every material (see `FORMATS`), and an index of them.
+The files are memory-mapped, so that processes share their pages.
+
+The version is a hash of the constants, the configuration of the plots and
+the format of the store, so that a store is ignored once any of them changes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+import calculations
+import material
+import plots
+import transport
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store")
+FORMAT_VERSION = 3
+
+# Formats of the stored data, as named by `plots.ResultCache`
+FORMATS = "json", "quantized"
+
+
+def _get_adapters():
+    """Return a dict with the kinds of plots and their adapters."""
+
+    return {kind: plots._get_adapter(kind) for kind in ("curves", "surfaces")}
+
+
+def get_version():
+    """Return the version of the store of the current constants and plots."""
+
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    digest.update(calculations._get_dtype(None).str.encode())
+    for name, constants in material.CONSTANTS.items():
+        digest.update(name.encode())
+        digest.update(np.asarray(constants.matrix, dtype=float))
+        digest.update(np.asarray(constants.density, dtype=float))
+    for kind, adapter in _get_adapters().items():
+        digest.update(kind.encode())
+        plots._update_digest(digest, adapter)
+
+    return digest.hexdigest()[:16]
+
+
+class Store:
+    """Read-only store of precomputed plot data in the directory `path`.
+    Get the data of a kind of plot in one of the `FORMATS` with `get`.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "index.json")) as file:
+            self.index = json.load(file)
+        self.texts = {
+            kind: np.load(os.path.join(path, f"{kind}.npy"), mmap_mode="r")
+            for kind in self.index
+        }
+
+    def get(self, kind, name, C, rho, format="json"):
+        """Return the JSON text of the `kind` of plot of the material `name`,
+        or the body of its quantized binary transport (see `transport.encode`)
+        if `format` is "quantized", or `None` if it is not in the store or
+        its stiffness matrix `C` or density `rho` differ from the predefined
+        ones.
+        """
+
+        key = f"{kind}-{format}"
+        if name not in self.index.get(key, {}):
+            return None
+
+        constants = material.CONSTANTS[name]
+        if not (
+            np.array_equal(C, constants.matrix)
+            and np.array_equal(rho, constants.density)
+        ):
+            return None
+
+        start, stop = self.index[key][name]
+        body = self.texts[key][start:stop].tobytes()
+
+        return body.decode() if format == "json" else body
+
+
+def load(path=STORE_PATH):
+    """Return the `Store` of the current version in the directory `path`, or
+    `None` if it has not been built.
+    """
+
+    path = os.path.join(path, get_version())
+    if not os.path.isfile(os.path.join(path, "index.json")):
+        return None
+
+    return Store(path)
+
+
+def build(path=STORE_PATH, verbose=False):
+    """Calculate the plot data of every predefined material and write the
+    store of the current version in the directory `path`, replacing stores
+    of other versions. Return the path of the new store.
+    """
+
+    version = get_version()
+    temporary_path = os.path.join(path, f".{version}-{os.getpid()}")
+    os.makedirs(temporary_path)
+
+    index = {}
+    for kind, adapter in _get_adapters().items():
+        for format in FORMATS:
+            key = f"{kind}-{format}"
+            index[key] = {}
+            texts = []
+            start = 0
+            for name, constants in material.CONSTANTS.items():
+                if verbose:
+                    print(f"{kind} ({format}): {name}")
+                text = _encode(adapter, format, constants.matrix, constants.density)
+                index[key][name] = start, start + len(text)
+                texts.append(np.frombuffer(text, dtype=np.uint8))
+                start += len(text)
+            np.save(os.path.join(temporary_path, f"{key}.npy"), np.concatenate(texts))
+
+    with open(os.path.join(temporary_path, "index.json"), "w") as file:
+        json.dump(index, file)
+
+    # Replace the stores at once, so that readers never see a partial store
+    for entry in os.listdir(path):
+        if entry != os.path.basename(temporary_path):
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+    os.rename(temporary_path, os.path.join(path, version))
+
+    return os.path.join(path, version)
+
+
+def _encode(adapter, format, C, rho):
+    """Return the bytes of the data of the plot `adapter` of the material
+    with stiffness matrix `C` and density `rho` in the `format`.
+    """
+
+    if format == "quantized":
+        return transport.encode(adapter.get_quantized(C, rho))
+
+    return json.dumps(adapter(C, rho)).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m precomputed",
+        description="Build the store of plot data of the predefined materials.",
+    )
+    parser.add_argument("--path", default=STORE_PATH, help="directory of the store")
+    parser.add_argument("--quiet", action="store_true", help="do not list materials")
+    args = parser.parse_args()
+
+    print(build(args.path, verbose=not args.quiet))
+
+
+if __name__ == "__main__":
+    main()
@@ -42,8 +42,21 @@ var createScene = function () {
     // Axes
     makeAxes(scene);
 
-    // Listener
+    // Faces are the same for every material, so they are fetched once
     var materialSelectElement = document.getElementById("material");
+    var facesQuery = new URLSearchParams({
+        format: "quantized",
+        v: materialSelectElement.dataset.version,
+    });
+    var facesRequest = fetch("plots/faces?" + facesQuery)
+        .then(function (response) {
+            return response.arrayBuffer();
+        })
+        .then(function (buffer) {
+            return transport.decode(buffer).faces;
+        });
+
+    // Listener
     materialSelectElement.addEventListener("change", function (event) {
         var target = event.target;
         var nameMaterial = target.value;
@@ -53,30 +66,37 @@ var createScene = function () {
             return;
         }
 
-        var data = {
+        var query = new URLSearchParams({
             material: nameMaterial,
-        };
-
-        var xhr = new XMLHttpRequest();
-        xhr.addEventListener("load", function (e) {
-            var json = JSON.parse(e.target.responseText);
-            var plotData3d = json.plotData3d;
-
-            var faces = plotData3d.faces;
-            var vertices = plotData3d.velocity.vertices;
-
-            for (i = 0; i < meshData.length; i++) {
-                var vertexData = new BABYLON.VertexData();
-
-                vertexData.positions = vertices[i];
-                vertexData.indices = faces;
+            format: "quantized",
+            stream: 1,
+            v: target.dataset.version,
+        });
 
-                vertexData.applyToMesh(meshData[i], true);
-            }
+        // The phase velocity surface comes first, so it is drawn as soon as
+        // it arrives
+        var drawn = false;
+        fetch("plots/surfaces?" + query).then(function (response) {
+            return transport.readStream(response, function (plotData3d) {
+                if (drawn || !plotData3d.velocity) {
+                    return;
+                }
+                drawn = true;
+
+                var vertices = plotData3d.velocity.vertices;
+
+                facesRequest.then(function (faces) {
+                    for (i = 0; i < meshData.length; i++) {
+                        var vertexData = new BABYLON.VertexData();
+
+                        vertexData.positions = vertices[i];
+                        vertexData.indices = faces;
+
+                        vertexData.applyToMesh(meshData[i], true);
+                    }
+                });
+            });
         });
-        xhr.open("POST", "");
-        xhr.setRequestHeader("Content-Type", "application/json");
-        xhr.send(JSON.stringify(data));
 
         target.oldValue = target.value;
     });
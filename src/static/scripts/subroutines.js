@@ -73,7 +73,8 @@ var subroutines = {
       C: C,
       rho: rho,
     };
-    this.postData(data, function (json) {
+    // Planes are streamed, so the plot is updated as soon as each one arrives
+    this.postDataStream(data, function (json) {
       elements.selects.material.value = json.material;
       elements.inputs.symmetry.value = json.symmetry;
 
@@ -102,22 +103,73 @@ var subroutines = {
     xhr.send(JSON.stringify(data));
   },
 
+  postDataStream: function (data, callback) {
+    // Call callback with the data received so far every time a line of the
+    // streamed response (NDJSON) arrives, with the lines merged into the data
+    var merged = {};
+    var pending = "";
+    var decoder = new TextDecoder();
+
+    fetch("?stream=1", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify(data),
+    }).then(function (response) {
+      var reader = response.body.getReader();
+      function read() {
+        return reader.read().then(function (result) {
+          if (!result.done) {
+            pending += decoder.decode(result.value, {stream: true});
+          }
+          var lines = pending.split("\n");
+          pending = lines.pop();
+          for (var i = 0; i < lines.length; i++) {
+            if (lines[i]) {
+              subroutines.merge(merged, JSON.parse(lines[i]));
+              callback(merged);
+            }
+          }
+          if (!result.done) return read();
+        });
+      }
+      return read();
+    });
+  },
+
+  merge: function (data, part) {
+    for (var key in part) {
+      var value = part[key];
+      var isDict = value !== null && typeof value === "object" &&
+                   !Array.isArray(value);
+      if (isDict && key in data) {
+        subroutines.merge(data[key], value);
+      } else {
+        data[key] = value;
+      }
+    }
+  },
+
   updatePolarPlot: function () {
     var axes2DState = axesState["2d"];
     var response = axes2DState.response;
-    if (!response) return;
-    var t = response.t;
+    var plane = axes2DState.selected.plane;
+    if (!response || !response.t || !response.t[plane]) return;
+
+    var t = response.t[plane];
 
-    var nearest_i;
+    // Angles are not equally spaced, so look for the nearest one
+    var nearest_i = 0;
+    var nearestDistance = Infinity;
     var i, j, k;  // Loop counters
     for (i = 0; i < t.length; i++) {
-      if (Math.abs(t[i] - axes2DState.selected.angle) < 0.01) {
+      var distance = Math.abs(t[i] - axes2DState.selected.angle);
+      distance = Math.min(distance, 2 * Math.PI - distance);
+      if (distance < nearestDistance) {
         nearest_i = i;
-        break
+        nearestDistance = distance;
       }
     }
 
-    var plane = axes2DState.selected.plane;
     var variable = axes2DState.selected.variable;
     var rAtPlane = response[variable].r[plane];
     var projection = (plane === "XZ") ? [0, 2]
@@ -177,22 +229,24 @@ var subroutines = {
     for (i = 0; i < 3; i++) {
       ctx.strokeStyle = colors[i];
       ctx.beginPath();
-      for (j = 1; j < t.length; j++) {
+      // The last segment joins the last angle with the first one
+      for (j = 1; j <= t.length; j++) {
         var prevX, prevY, px, py;
+        k = j % t.length;
         if (variable == "groupvelocity") {
           var prevGroupVelocity = rAtPlane[j-1][i];
           var prevX = prevGroupVelocity[xIndex] * drawingScale;
           var prevY = prevGroupVelocity[yIndex] * drawingScale;
-          var groupVelocity = rAtPlane[j][i];
+          var groupVelocity = rAtPlane[k][i];
           var px = groupVelocity[xIndex] * drawingScale;
           var py = groupVelocity[yIndex] * drawingScale;
         } else {
           var prevRadius = rAtPlane[j-1][i] * drawingScale;
           var prevX = prevRadius * Math.cos(t[j-1]);
           var prevY = prevRadius * Math.sin(t[j-1]);
-          var pRadius = rAtPlane[j][i] * drawingScale;
-          var px = pRadius * Math.cos(t[j]);
-          var py = pRadius * Math.sin(t[j]);
+          var pRadius = rAtPlane[k][i] * drawingScale;
+          var px = pRadius * Math.cos(t[k]);
+          var py = pRadius * Math.sin(t[k]);
         }
         ctx.moveTo(centerX + prevX, centerY - prevY);
         ctx.lineTo(centerX + px, centerY - py);
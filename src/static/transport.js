@@ -0,0 +1,155 @@
+// Decoder of plot data sent in the binary transport (see transport.py).
+// Arrays are views of the response buffer, nested in plain arrays along every
+// axis but the last one, which is a typed array like Float32Array. Quantized
+// arrays are turned back into Float32Array. Buffers are little-endian, like
+// the typed arrays of every common platform.
+var transport = {
+    mimetype: "application/vnd.elasticas.arrays",
+
+    types: {
+        float32: Float32Array,
+        int8: Int8Array,
+        int16: Int16Array,
+        int32: Int32Array,
+        uint8: Uint8Array,
+        uint16: Uint16Array,
+        uint32: Uint32Array,
+    },
+
+    // Call callback with the data received so far every time a frame of a
+    // streamed response arrives, with the parts merged into the data
+    readStream: function (response, callback) {
+        var reader = response.body.getReader();
+        var pending = new Uint8Array(0);
+        var data = {};
+
+        function read() {
+            return reader.read().then(function (result) {
+                if (result.done) {
+                    return;
+                }
+
+                var joined = new Uint8Array(pending.length + result.value.length);
+                joined.set(pending);
+                joined.set(result.value, pending.length);
+                pending = joined;
+
+                while (pending.length >= 4) {
+                    var view = new DataView(pending.buffer, pending.byteOffset);
+                    var length = view.getUint32(0, true);
+                    if (pending.length < 4 + length) {
+                        break;
+                    }
+                    // Copy the frame so that its arrays are aligned
+                    var frame = pending.slice(4, 4 + length).buffer;
+                    transport.merge(data, transport.decode(frame));
+                    pending = pending.subarray(4 + length);
+                    callback(data);
+                }
+                return read();
+            });
+        }
+
+        return read();
+    },
+
+    merge: function (data, part) {
+        for (var key in part) {
+            var value = part[key];
+            var isDict =
+                value !== null &&
+                typeof value === "object" &&
+                value.constructor === Object;
+            if (isDict && key in data) {
+                transport.merge(data[key], value);
+            } else {
+                data[key] = value;
+            }
+        }
+    },
+
+    decode: function (buffer) {
+        var length = new DataView(buffer).getUint32(0, true);
+        var header = new TextDecoder().decode(new Uint8Array(buffer, 4, length));
+
+        return transport.replaceArrays(JSON.parse(header), buffer, 4 + length);
+    },
+
+    replaceArrays: function (value, buffer, start) {
+        if (value === null || typeof value !== "object") {
+            return value;
+        }
+        if (Array.isArray(value)) {
+            return value.map(function (item) {
+                return transport.replaceArrays(item, buffer, start);
+            });
+        }
+        if ("$array" in value) {
+            var array = value["$array"];
+            var flat = transport.readArray(array, buffer, start);
+            return transport.nest(flat, array.shape);
+        }
+        if ("$quantized" in value) {
+            var quantized = value["$quantized"];
+            var array = quantized.values["$array"];
+            var flat = transport.dequantize(
+                transport.readArray(array, buffer, start),
+                array.shape,
+                quantized.scale,
+                quantized.delta
+            );
+            return transport.nest(flat, array.shape);
+        }
+
+        var result = {};
+        for (var key in value) {
+            result[key] = transport.replaceArrays(value[key], buffer, start);
+        }
+        return result;
+    },
+
+    readArray: function (array, buffer, start) {
+        var count = array.shape.reduce(function (a, b) {
+            return a * b;
+        }, 1);
+
+        return new transport.types[array.dtype](
+            buffer,
+            start + array.offset,
+            count
+        );
+    },
+
+    dequantize: function (values, shape, scale, delta) {
+        var result = new Float32Array(values.length);
+        var stride = shape.length ? values.length / shape[0] : 0;
+        var sums = new Float64Array(stride);
+
+        for (var i = 0; i < values.length; i++) {
+            if (delta) {
+                sums[i % stride] += values[i];
+                result[i] = sums[i % stride] * scale;
+            } else {
+                result[i] = values[i] * scale;
+            }
+        }
+        return result;
+    },
+
+    nest: function (flat, shape) {
+        if (shape.length === 0) {
+            return flat[0];
+        }
+        if (shape.length === 1) {
+            return flat;
+        }
+
+        var stride = flat.length / shape[0];
+        var nested = [];
+        for (var i = 0; i < shape[0]; i++) {
+            var part = flat.subarray(i * stride, (i + 1) * stride);
+            nested.push(transport.nest(part, shape.slice(1)));
+        }
+        return nested;
+    },
+};
@@ -0,0 +1,154 @@
+"""Binary transport of plot data with typed arrays.
+
+A body has the following parts:
+
+    header length: little-endian uint32
+           header: JSON text padded with spaces to a multiple of 4 bytes
+          buffers: raw little-endian arrays, each one starting at a
+                   multiple of 4 bytes
+
+The header is the data with every array replaced by an object
+{"$array": {"dtype": ..., "shape": [...], "offset": ...}}, where the offset
+is the position of its buffer from the start of the buffers.
+Floating point arrays are sent as "float32" and 64-bit integer arrays as
+"uint32", while smaller integer arrays keep their type, so that clients can
+view the buffers as typed arrays like `Float32Array` and `Uint32Array`
+without copying or parsing them (see `static/transport.js`).
+
+Arrays may also be quantized to small integers (see `quantize`), which
+clients turn back into floating point arrays.
+
+Data sent in parts are streamed as frames, which are bodies preceded by their
+length as little-endian uint32 (see `encode_frame`).
+"""
+
+import json
+
+import numpy as np
+
+MIMETYPE = "application/vnd.elasticas.arrays"
+STREAM_MIMETYPE = "application/vnd.elasticas.arrays-stream"
+
+
+def _get_type(dtype):
+    """Return the name of the type of the buffer of an array of `dtype`."""
+
+    if dtype.kind == "f":
+        return "float32"
+    if dtype.itemsize == 8:  # indices
+        return "uint32"
+
+    return dtype.name
+
+
+def quantize(array, scale, delta=False):
+    """Return the quantized form of `array`, whose values are the integers
+    closest to `array / scale`, of the smallest signed type that holds them.
+    If `delta` is true, the differences along the first axis are kept
+    instead, which are small for smooth curves.
+
+    Results are dicts {"$quantized": {"values": ..., "scale": ...,
+    "delta": ...}} that are turned back into arrays by the decoders.
+    """
+
+    values = np.rint(np.asarray(array) / scale).astype(np.int64)
+    if delta:
+        values = np.diff(values, axis=0, prepend=0)
+
+    for dtype in np.int8, np.int16, np.int32:
+        info = np.iinfo(dtype)
+        if not values.size or info.min <= values.min() and values.max() <= info.max:
+            break
+
+    return {
+        "$quantized": {
+            "values": values.astype(dtype),
+            "scale": float(scale),
+            "delta": delta,
+        }
+    }
+
+
+def encode(data):
+    """Return the body of the nested dicts and lists `data`, whose values may
+    be arrays.
+    """
+
+    buffers = []
+    size = 0
+
+    def replace(value):
+        nonlocal size
+        if isinstance(value, dict):
+            return {key: replace(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [replace(item) for item in value]
+        if not isinstance(value, np.ndarray):
+            return value
+
+        dtype = _get_type(value.dtype)
+        buffer = np.ascontiguousarray(value, dtype=np.dtype(dtype).newbyteorder("<"))
+        buffers.append(buffer.tobytes() + b"\0" * (-buffer.nbytes % 4))
+        array = {"dtype": dtype, "shape": list(value.shape), "offset": size}
+        size += len(buffers[-1])
+
+        return {"$array": array}
+
+    header = json.dumps(replace(data)).encode()
+    header += b" " * (-len(header) % 4)
+
+    return b"".join([np.array(len(header), dtype="<u4").tobytes(), header, *buffers])
+
+
+def decode(body):
+    """Return the nested dicts and lists of the `body`, with arrays that are
+    views of it, and quantized arrays turned back into floating point arrays.
+    """
+
+    length = int(np.frombuffer(body, dtype="<u4", count=1)[0])
+    start = 4 + length
+
+    def replace(value):
+        if isinstance(value, list):
+            return [replace(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if "$quantized" in value:
+            quantized = value["$quantized"]
+            values = replace(quantized["values"])
+            if quantized["delta"]:
+                values = np.cumsum(values, axis=0, dtype=np.int64)
+            return (values * quantized["scale"]).astype(np.float32)
+        if "$array" not in value:
+            return {key: replace(item) for key, item in value.items()}
+
+        array = value["$array"]
+        dtype = np.dtype(array["dtype"]).newbyteorder("<")
+        count = int(np.prod(array["shape"]))
+        offset = start + array["offset"]
+
+        return np.frombuffer(body, dtype, count, offset).reshape(array["shape"])
+
+    return replace(json.loads(body[4:start]))
+
+
+def encode_frame(data):
+    """Return the frame of a stream with the body of `data` (see `encode`)."""
+
+    return get_frame(encode(data))
+
+
+def get_frame(body):
+    """Return the frame of a stream with a `body` returned by `encode`."""
+
+    return np.array(len(body), dtype="<u4").tobytes() + body
+
+
+def iter_frames(stream):
+    """Yield the data of every frame of the bytes `stream` (see `decode`)."""
+
+    start = 0
+    while start < len(stream):
+        length = int(np.frombuffer(stream, dtype="<u4", count=1, offset=start)[0])
+        yield decode(stream[start + 4 : start + 4 + length])
+        start += 4 + length
@@ -0,0 +1,191 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import app
+import material
+import plots
+import transport
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+class TestPlotData:
+    def test_conditional_request_is_answered_with_not_modified(self, client):
+        response = client.get("/plots/surfaces", query_string={"material": "Zn (zinc)"})
+        etag = response.headers["ETag"]
+
+        cached = client.get(
+            "/plots/surfaces",
+            query_string={"material": "Zn (zinc)"},
+            headers={"If-None-Match": etag},
+        )
+
+        assert response.status_code == 200 and cached.status_code == 304
+        assert cached.headers["ETag"] == etag and not cached.data
+
+    def test_etag_depends_on_material_and_format(self, client):
+        etags = {
+            client.get(
+                "/plots/curves", query_string={"material": name}, headers=headers
+            ).headers["ETag"]
+            for name in ("Zn (zinc)", "Cu (copper)")
+            for headers in ({}, {"Accept": transport.MIMETYPE})
+        }
+
+        assert len(etags) == 4
+
+    def test_versioned_data_are_kept_for_long(self, client):
+        query = {"material": "Cu (copper)"}
+        versioned = client.get(
+            "/plots/curves", query_string=query | {"v": app._get_version()}
+        )
+        unversioned = client.get("/plots/curves", query_string=query)
+
+        assert versioned.cache_control.max_age >= 24 * 60 * 60
+        assert unversioned.cache_control.no_cache
+
+    def test_data_of_given_constants_match_plot_data(self, client):
+        constants = material.CONSTANTS["Ti (titanium)"]
+        C, rho = constants.matrix, constants.density
+        query = {"C": json.dumps(C.tolist()), "rho": rho}
+
+        response = client.get("/plots/curves", query_string=query)
+
+        assert response.get_json() == plots.get_velocity_curves(C, rho)
+
+    def test_invalid_query_is_a_bad_request(self, client):
+        response = client.get("/plots/curves", query_string={"C": "[1, 2]", "rho": 1})
+
+        assert response.status_code == 400
+
+    def test_streamed_data_match_plot_data(self, client):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        query = {"material": "Zn (zinc)", "stream": 1}
+
+        response = client.get("/plots/curves", query_string=query)
+        parts = [json.loads(line) for line in response.data.splitlines()]
+
+        assert response.mimetype == "application/x-ndjson"
+        assert plots._merge(parts) == plots.get_velocity_curves(
+            constants.matrix, constants.density
+        )
+
+    def test_faces_are_a_versioned_resource_apart_from_surfaces(self, client):
+        query = {"v": app._get_version()}
+
+        response = client.get("/plots/faces", query_string=query)
+        cached = client.get(
+            "/plots/faces",
+            query_string=query,
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        surfaces = client.get("/plots/surfaces", query_string={"material": "Zn (zinc)"})
+
+        faces = plots._get_adapter("surfaces").faces
+        assert response.get_json() == {"faces": faces.ravel().tolist()}
+        assert response.cache_control.immutable
+        assert cached.status_code == 304
+        assert "faces" not in surfaces.get_json()
+
+
+class TestBatch:
+    def test_results_match_stacked_plot_data(self, client):
+        constants = material.CONSTANTS["Cu (copper)"]
+        materials = [
+            {"material": "Zn (zinc)"},
+            {"C": constants.matrix.tolist(), "rho": constants.density},
+        ]
+
+        response = client.post(
+            "/batch", json={"materials": materials, "outputs": ["symmetry", "curves"]}
+        )
+        results = response.get_json()["results"]
+
+        assert [result["symmetry"] for result in results] == ["Hexagonal", "Cubic"]
+        assert (
+            results[1]["curves"]
+            == plots.get_stacked_plot_data(
+                "curves", constants.matrix[None], [constants.density]
+            )[0]
+        )
+        assert all("surfaces" not in result for result in results)
+
+    def test_invalid_materials_get_errors(self, client):
+        materials = [
+            {"material": "unobtainium"},
+            {"C": [[1, 2]], "rho": 1},
+            {"material": "Zn (zinc)"},
+        ]
+
+        response = client.post(
+            "/batch",
+            json={"materials": materials, "outputs": ["surfaces"], "resolution": 16},
+            headers={"Accept": transport.MIMETYPE},
+        )
+        data = transport.decode(response.data)
+        results = data["results"]
+
+        assert response.status_code == 200
+        assert data["faces"].size % 3 == 0
+        assert "error" in results[0] and "error" in results[1]
+        assert results[2]["surfaces"]["velocity"]["vertices"].shape[0] == 3
+
+    def test_physically_invalid_materials_get_null_surfaces(self, client):
+        C = material.CONSTANTS["Zn (zinc)"].matrix.tolist()
+        materials = [
+            {"C": (-np.eye(6)).tolist(), "rho": 1000},
+            {"C": C, "rho": 0},
+            {"C": C, "rho": -1},
+            {"material": "Zn (zinc)"},
+        ]
+
+        response = client.post(
+            "/batch",
+            json={"materials": materials, "outputs": ["surfaces"], "resolution": 16},
+        )
+        results = response.get_json()["results"]
+
+        assert response.status_code == 200
+        for result in results[:3]:
+            assert result["surfaces"]["velocity"]["max"] == 0
+            assert not np.any(result["surfaces"]["slowness"]["vertices"])
+        assert results[3]["surfaces"]["velocity"]["max"] > 0
+
+    def test_invalid_request_is_a_bad_request(self, client):
+        for data in {}, {"materials": [], "outputs": ["x"]}, {"materials": {}}:
+            assert client.post("/batch", json=data).status_code == 400
+
+
+class TestStartup:
+    # Seconds of the import of the modules of the application, without
+    # dependencies like numpy and flask
+    IMPORT_BUDGET = 0.1
+
+    def test_import_is_fast_and_builds_no_plots(self, tmp_path):
+        code = "import app, plots; assert not plots._get_adapter.cache_info().currsize"
+        env = os.environ | {"PYTHONPATH": os.path.dirname(app.__file__)}
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        command = [sys.executable, "-X", f"pycache_prefix={tmp_path}", "-X"]
+        command += ["importtime", "-c", code]
+
+        subprocess.run(command, env=env, check=True, capture_output=True)  # cache
+        process = subprocess.run(command, env=env, check=True, capture_output=True)
+
+        modules = "app", "calculations", "material", "plots", "precomputed", "transport"
+        seconds = 0
+        for line in process.stderr.decode().splitlines():
+            if not line.startswith("import time:") or "self" in line:
+                continue
+            self_time, _, name = line.removeprefix("import time:").split("|")
+            if name.strip().split(".")[0] in modules:
+                seconds += int(self_time) / 1e6
+
+        assert seconds < self.IMPORT_BUDGET
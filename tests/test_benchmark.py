@@ -0,0 +1,34 @@
+import json
+
+import benchmark
+
+
+class TestBenchmark:
+    def test_every_stage_of_benchmarks_is_timed(self):
+        benchmarks = benchmark.get_benchmarks(sizes=[100])
+        benchmarks = {
+            name: stages
+            for name, stages in benchmarks.items()
+            if name.endswith(("/cubic/100", "/cubic"))
+        }
+
+        results = benchmark.run(benchmarks)
+
+        assert "curves/cubic/100/json" in results
+        assert "POST / numbers/cubic/json" in results
+        assert "GET /plots/surfaces/cubic/request" in results
+        assert len(results) == 3 * (len(benchmarks) - 2) + 4 * 2
+        assert all(seconds > 0 for seconds in results.values())
+
+    def test_slower_results_than_baseline_are_regressions(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        benchmark.save({"do/cubic/100/compute": 1.0, "GET //request": 2.0}, path)
+        benchmark.save({"do/cubic/100/compute": 0.5}, path)
+        baseline = benchmark.load(path)
+        results = {"do/cubic/100/compute": 0.7, "GET //request": 2.1, "new": 9.0}
+
+        regressions = benchmark.compare(results, baseline, threshold=0.25)
+
+        assert json.loads(path.read_text()) == baseline
+        assert baseline == {"do/cubic/100/compute": 0.5, "GET //request": 2.0}
+        assert regressions == [("do/cubic/100/compute", 0.5, 0.7)]
@@ -1,7 +1,9 @@
 import numpy as np
+import pytest
 from numpy.testing import assert_allclose, assert_equal
 
 import calculations
+import material
 from material import symmetries
 from material.constants import Cubic
 from material.types import Material
@@ -59,3 +61,375 @@ class TestIsotropicMaterial:
         points = np.dstack([x, y, z])
 
         return points
+
+
+class TestCardanoSolver:
+    def test_phase_velocities_match_lapack_solver(self):
+        points = self.make_points()
+
+        for constants in material.CONSTANTS.values():
+            C, rho = constants.matrix, constants.density
+            _, expected, _ = calculations.do(C=C, rho=rho, l=points)
+            _, retrieved, _ = calculations.do(C=C, rho=rho, l=points, solver="cardano")
+
+            assert_allclose(retrieved, expected, rtol=1e-12)
+
+    def test_eigenvectors_diagonalize_christoffel_tensor(self):
+        points = self.make_points()
+
+        for constants in material.CONSTANTS.values():
+            C, rho = constants.matrix, constants.density
+            Gamma, c, A = calculations.do(C=C, rho=rho, l=points, solver="cardano")
+            w = rho * c**2 / 1e9
+
+            retrieved = A @ (w[..., np.newaxis] * A.swapaxes(-2, -1))
+
+            assert_allclose(
+                A.swapaxes(-2, -1) @ A, np.broadcast_to(np.eye(3), A.shape), atol=1e-12
+            )
+            assert_allclose(retrieved, Gamma, atol=1e-9 * np.abs(Gamma).max())
+
+    def test_degenerate_matrices(self):
+        Gamma = np.array([np.eye(3), np.diag([1.0, 1, 2]), np.diag([3.0, 1, 3])])
+
+        w, v = calculations.eigh_3x3(Gamma)
+
+        assert_allclose(w, [[1, 1, 1], [1, 1, 2], [1, 3, 3]])
+        assert_allclose(
+            v @ (w[..., np.newaxis] * v.swapaxes(-2, -1)), Gamma, atol=1e-15
+        )
+
+    def make_points(self):
+        angle_samples = 60
+        u, v = np.meshgrid(
+            np.linspace(-np.pi, np.pi, angle_samples),
+            np.linspace(-np.pi / 2, np.pi / 2, angle_samples + 1)[::-1],
+        )
+        x, y, z = np.cos(u) * np.cos(v), np.sin(u) * np.cos(v), np.sin(v)
+        points = np.dstack([x, y, z])
+
+        return points
+
+
+class TestSymmetryKernels:
+    def test_kernel_chosen_by_symmetry(self):
+        expected_kernels = {
+            "Al (aluminium)": "orthorhombic",
+            "Zn (zinc)": "hexagonal",
+            "KAP (potassium acid phthalate)": "orthorhombic",
+        }
+
+        for name, expected_kernel in expected_kernels.items():
+            retrieved_kernel = calculations.get_kernel(material.CONSTANTS[name].matrix)
+
+            assert retrieved_kernel == expected_kernel
+
+    def test_isotropic_kernel_chosen_for_isotropic_material(self):
+        isotropic_material = Cubic(density=4000, c11=100, c12=28, c44=36)
+
+        assert calculations.get_kernel(isotropic_material.matrix) == "isotropic"
+
+    def test_triclinic_material_falls_back_to_general_kernel(self):
+        C = material.CONSTANTS["Zn (zinc)"].matrix.copy()
+        C[0, 5] = C[5, 0] = 1
+
+        assert calculations.get_kernel(C) == "general"
+
+    def test_kernels_match_general_path(self):
+        points = TestCardanoSolver().make_points()
+        isotropic_material = Cubic(density=4000, c11=100, c12=28, c44=36)
+        materials = [isotropic_material, *material.CONSTANTS.values()]
+
+        for constants in materials:
+            C, rho = constants.matrix, constants.density
+            expected_Gamma, expected_c, _ = calculations.do(C=C, rho=rho, l=points)
+            Gamma, c, A = calculations.do(C=C, rho=rho, l=points, kernel="auto")
+            w = rho * c**2 / 1e9
+
+            assert_allclose(Gamma, expected_Gamma, rtol=1e-12, atol=1e-12)
+            assert_allclose(c, expected_c, rtol=1e-12)
+            assert_allclose(
+                A @ (w[..., np.newaxis] * A.swapaxes(-2, -1)),
+                Gamma,
+                atol=1e-9 * np.abs(Gamma).max(),
+            )
+
+
+class TestChristoffelOperator:
+    def test_match_slim_matrix_expansion(self):
+        rng = np.random.default_rng(0)
+        C = rng.uniform(-10, 10, [6, 6]) + np.diag(rng.uniform(100, 200, 6))
+        C = (C + C.T) / 2
+        points = rng.normal(size=[50, 4, 3])
+
+        L = calculations.SlimMatrix.get_matrix_from_vector(points)
+        expected = L.swapaxes(-2, -1) @ C @ L
+        retrieved = calculations.ChristoffelOperator(C, rho=1)(points)
+
+        assert_allclose(retrieved, expected, rtol=1e-12, atol=1e-12)
+
+    def test_single_direction(self):
+        C = material.CONSTANTS["KAP (potassium acid phthalate)"].matrix
+
+        retrieved = calculations.get_christoffel_tensor(C, np.array([1, 0, 0]))
+        expected = C[np.ix_([0, 5, 4], [0, 5, 4])]
+
+        assert_equal(retrieved, expected)
+
+
+class TestGroupVelocities:
+    def test_match_slim_matrix_expansion(self):
+        constants = material.CONSTANTS["KAP (potassium acid phthalate)"]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+        _, c, A = calculations.do(C=C, rho=rho, l=points)
+
+        new_A = calculations.SlimMatrix.get_matrix_from_vector(A.swapaxes(-2, -1))
+        g = points[..., np.newaxis, np.newaxis, :] @ new_A.swapaxes(-2, -1) @ C @ new_A
+        expected = 1e9 * g.squeeze().swapaxes(-2, -1) / (rho * c[..., np.newaxis, :])
+        retrieved = calculations.get_group_velocities(C=C, rho=rho, l=points, c=c, A=A)
+
+        assert_allclose(retrieved, expected, rtol=1e-12, atol=1e-9)
+
+    def test_single_direction(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        l = np.array([0, 0, 1])
+        _, c, A = calculations.do(C=C, rho=rho, l=l)
+
+        retrieved = calculations.get_group_velocities(C=C, rho=rho, l=l, c=c, A=A)
+
+        assert retrieved.shape == (3, 3)
+        assert_allclose(retrieved, c * l[:, np.newaxis], atol=1e-9)
+
+    def test_store_result_in_given_array(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+        _, c, A = calculations.do(C=C, rho=rho, l=points)
+        out = np.empty(points.shape + (3,))
+
+        retrieved = calculations.get_group_velocities(C, rho, points, c, A, out=out)
+
+        assert retrieved is out
+
+    def test_calculate_together_with_phase_velocities(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+        _, c, A = calculations.do(C=C, rho=rho, l=points)
+
+        *_, retrieved = calculations.do(C=C, rho=rho, l=points, group=True)
+        expected = calculations.get_group_velocities(C, rho, points, c, A)
+
+        assert_allclose(retrieved, expected)
+
+
+class TestSinglePrecision:
+    def test_results_have_requested_type(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        points = TestCardanoSolver().make_points()
+
+        for kernel in "general", "auto":
+            retrieved_arrays = calculations.do(
+                constants.matrix,
+                constants.density,
+                points,
+                solver="cardano",
+                kernel=kernel,
+                group=True,
+                dtype=np.float32,
+            )
+
+            for retrieved_array in retrieved_arrays:
+                assert retrieved_array.dtype == np.float32
+
+    def test_default_type_can_be_changed_globally(self, monkeypatch):
+        monkeypatch.setattr(calculations, "default_dtype", np.float32)
+        constants = material.CONSTANTS["Zn (zinc)"]
+
+        _, c, _ = calculations.do(constants.matrix, constants.density, np.eye(3))
+
+        assert c.dtype == np.float32
+
+    def test_precision_report(self):
+        points = TestCardanoSolver().make_points()
+
+        for constants in material.CONSTANTS.values():
+            report = calculations.get_precision_report(
+                constants.matrix, constants.density, points, solver="cardano"
+            )
+
+            assert report["c"] < 1e-6
+            assert report["A"] < 1e-6
+            assert report["g"] < 1e-4
+
+
+class TestChunkedEvaluation:
+    def test_chunked_results_match_single_evaluation(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+
+        expected_arrays = calculations.do(C, rho, points, group=True)
+        out = tuple(np.empty_like(array) for array in expected_arrays)
+        retrieved_arrays = calculations.solve_into(C, rho, points, out, chunk=1000)
+
+        for retrieved_array, expected_array in zip(retrieved_arrays, expected_arrays):
+            assert_allclose(retrieved_array, expected_array)
+
+    def test_store_results_in_memory_mapped_files(self, tmp_path):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+
+        _, expected, _ = calculations.do(C, rho, points)
+        _, c, A = calculations.open_memmaps(tmp_path, points.shape)
+        calculations.solve_into(C, rho, points, (None, c, A), chunk=1000)
+        del c, A
+        retrieved = np.load(tmp_path / "c.npy")
+
+        assert_allclose(retrieved, expected)
+
+    def test_null_tiles_for_invalid_material(self):
+        points = TestCardanoSolver().make_points()
+
+        tiles = calculations.iter_solve(np.zeros([6, 6]), 1, points, chunk=1000)
+
+        for _, _, retrieved_arrays in tiles:
+            for retrieved_array in retrieved_arrays:
+                assert not retrieved_array.any()
+
+    def test_strongly_elliptic_material_that_is_not_positive_definite(self):
+        # Isotropic with Lamé constants λ = -0.8μ, so that c11 + 2c12 < 0
+        mu, lambda_ = 30, -24
+        constants = Cubic(density=1000, c11=lambda_ + 2 * mu, c12=lambda_, c44=mu)
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+
+        expected_arrays = calculations.do(C, rho, points, group=True)
+        out = tuple(np.empty_like(array) for array in expected_arrays)
+        retrieved_arrays = calculations.solve_into(C, rho, points, out, chunk=1000)
+
+        assert expected_arrays[1].max() > 0
+        for retrieved_array, expected_array in zip(retrieved_arrays, expected_arrays):
+            assert_allclose(retrieved_array, expected_array)
+
+
+class TestParallelEvaluation:
+    @pytest.mark.parametrize("pool", ["thread", "process"])
+    def test_parallel_results_match_single_evaluation(self, pool):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+
+        expected_arrays = calculations.do(C, rho, points, group=True)
+        retrieved_arrays = calculations.do_parallel(
+            C, rho, points, workers=2, pool=pool, chunk=1000, group=True
+        )
+
+        for retrieved_array, expected_array in zip(retrieved_arrays, expected_arrays):
+            assert retrieved_array.shape == expected_array.shape
+            assert_allclose(retrieved_array, expected_array)
+
+    def test_directions_are_split_among_workers(self, monkeypatch):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        points = TestCardanoSolver().make_points().reshape(-1, 3)[:1000]
+        solve_into = calculations.solve_into
+        sizes = []
+
+        def solve_and_keep_size(C, rho, l, out, **kwargs):
+            sizes.append(len(l))
+            solve_into(C, rho, l, out, **kwargs)
+
+        monkeypatch.setattr(calculations, "solve_into", solve_and_keep_size)
+        calculations.do_parallel(constants.matrix, constants.density, points, 4)
+
+        assert sorted(sizes) == [250] * 4
+
+
+class TestMaterialStacks:
+    def make_stack(self):
+        materials = list(material.CONSTANTS.values())
+        C = np.stack([constants.matrix for constants in materials])
+        rho = np.array([constants.density for constants in materials])
+
+        return C, rho
+
+    def test_stack_results_match_single_materials(self):
+        C, rho = self.make_stack()
+        points = TestCardanoSolver().make_points()[::4, ::4]
+
+        retrieved_arrays = calculations.do(C, rho, points, group=True)
+
+        for i in range(len(C)):
+            expected_arrays = calculations.do(C[i], rho[i], points, group=True)
+            for retrieved_array, expected_array in zip(
+                retrieved_arrays, expected_arrays
+            ):
+                assert retrieved_array.shape[1:] == expected_array.shape
+                assert_allclose(retrieved_array[i], expected_array, atol=1e-9)
+
+    def test_invalid_materials_do_not_null_the_stack(self):
+        C, rho = self.make_stack()
+        C[1] = 0
+        rho[2] = 0
+        points = TestCardanoSolver().make_points()[::4, ::4]
+
+        _, c, _, g = calculations.do(C, rho, points, group=True)
+
+        assert not c[1:3].any() and not g[1:3].any()
+        assert (c[0] > 0).all() and (c[3:] > 0).all()
+
+    def test_kernel_chosen_for_every_material_of_the_stack(self):
+        C, _ = self.make_stack()
+        zinc = material.CONSTANTS["Zn (zinc)"].matrix
+
+        assert calculations.get_kernel(C) == "orthorhombic"
+        assert calculations.get_kernel(np.stack([zinc, zinc])) == "hexagonal"
+
+
+class TestReducedEvaluation:
+    @pytest.mark.parametrize(
+        "name", ["Cu (copper)", "Zn (zinc)", "Sandstone", "BG (benzoyl glycine)"]
+    )
+    def test_reduced_results_match_single_evaluation(self, name):
+        constants = material.CONSTANTS[name]
+        C, rho = constants.matrix, constants.density
+        points = TestCardanoSolver().make_points()
+
+        expected_arrays = calculations.do(C, rho, points, group=True)
+        retrieved_arrays = calculations.do_reduced(C, rho, points, group=True)
+
+        for retrieved_array, expected_array in zip(retrieved_arrays, expected_arrays):
+            assert retrieved_array.shape == expected_array.shape
+        Gamma, c, A, g = retrieved_arrays
+        assert_allclose(Gamma, expected_arrays[0], atol=1e-9)
+        assert_allclose(c, expected_arrays[1])
+        assert_allclose(g, expected_arrays[3], atol=1e-9)
+        # Polarizations of non-degenerate modes are equal up to their sign
+        dot = np.einsum("...ij,...ij->...j", A, expected_arrays[2])
+        gap = np.diff(np.sort(c, axis=-1), axis=-1).min(axis=-1)
+        assert_allclose(np.abs(dot[gap > 1e-3 * c.max()]), 1, atol=1e-6)
+
+    def test_fold_directions_into_fewer_directions(self):
+        C = material.CONSTANTS["Cu (copper)"].matrix
+        points = TestCardanoSolver().make_points()
+
+        n, R, inverse = calculations.fold_directions(
+            points, calculations.get_symmetry(C)
+        )
+
+        assert len(n) < points[..., 0].size / 4
+        assert R.shape == points.shape + (3,)
+        assert inverse.shape == points.shape[:-1]
+
+    def test_null_output_for_invalid_material(self):
+        points = TestCardanoSolver().make_points()
+
+        retrieved_arrays = calculations.do_reduced(
+            np.zeros([6, 6]), 1, points, group=True
+        )
+
+        for retrieved_array in retrieved_arrays:
+            assert not retrieved_array.any()
@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+import calculations
+import export
+import material
+
+
+class TestExport:
+    def test_files_of_materials_are_read(self, tmp_path):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        path = tmp_path / "materials.csv"
+        components = {
+            f"C{i + 1}{j + 1}": C[i, j] for i in range(6) for j in range(i, 6)
+        }
+        with open(path, "w") as file:
+            file.write(",".join(["name", "rho", *components]) + "\n")
+            file.write(",".join(["zinc", str(rho), *map(str, components.values())]))
+        json_path = tmp_path / "materials.json"
+        json_path.write_text(
+            json.dumps([{"name": "zinc", "C": C.tolist(), "rho": rho}])
+        )
+
+        for materials in (
+            export.read_materials(str(path)),
+            export.read_materials(str(json_path)),
+        ):
+            ((name, retrieved_C, retrieved_rho),) = materials
+            assert name == "zinc" and retrieved_rho == rho
+            assert_allclose(retrieved_C, C)
+
+    def test_exported_velocities_match_calculations(self, tmp_path):
+        materials = export.read_materials()[:3]
+        l = export.get_directions(1)
+
+        filenames = export.export(materials, l, tmp_path, workers=2)
+
+        for (_, C, rho), filename in zip(materials, filenames):
+            _, c, _, g = calculations.do(C, rho, l, group=True)
+            with np.load(filename) as data:
+                assert_allclose(data["velocity"], c, rtol=1e-9)
+                assert_allclose(data["slowness"], 1 / c, rtol=1e-9)
+                assert_allclose(data["groupvelocity"], g.swapaxes(-2, -1), atol=1e-6)
+
+    def test_exported_materials_are_skipped(self, tmp_path):
+        materials = export.read_materials()[:2]
+        l = export.get_directions(0)
+        filenames = export.export(materials, l, tmp_path, workers=1)
+        os.remove(filenames[1])
+        mtime = os.stat(filenames[0]).st_mtime_ns
+
+        export.export(materials, l, tmp_path, workers=1)
+
+        assert os.stat(filenames[0]).st_mtime_ns == mtime
+        assert os.path.isfile(filenames[1])
+
+    def test_materials_with_changed_constants_are_exported_again(self, tmp_path):
+        (name, C, rho), *_ = export.read_materials()
+        l = export.get_directions(0)
+        (filename,) = export.export([(name, C, rho)], l, tmp_path, workers=1)
+
+        export.export([(name, 2 * C, rho)], l, tmp_path, workers=1)
+        with np.load(filename) as data:
+            assert_allclose(data["C"], 2 * C)
+
+        export.export([(name, 2 * C, 2 * rho)], l, tmp_path, workers=1)
+        with np.load(filename) as data:
+            assert data["rho"] == 2 * rho
@@ -1,8 +1,10 @@
 import numpy as np
+from numpy.testing import assert_allclose
 
 import material
-from material import symmetries
+from material import registry, symmetries
 from material.constants import Cubic, Hexagonal, Orthorhombic
+from material.index import MaterialIndex
 from material.types import Material
 
 
@@ -45,6 +47,81 @@ class TestDetect:
 
         assert not name, "Retrieved non-empty name of non-existent material"
 
+    def test_return_name_material_within_tolerance(self, monkeypatch):
+        C = np.full([6, 6], 5.38197)
+        mock = MaterialConstantsMock()
+        mock.matrix = C
+        monkeypatch.setattr(material, "CONSTANTS", {"Test material": mock})
+
+        # 5.38196 is in another bucket of the index, but close for allclose
+        assert material.detect(np.full([6, 6], 5.38196), 1) == "Test material"
+        assert material.detect(C * (1 - 2e-5), 1) == ""
+
+
+class TestMaterialIndex:
+    def test_found_materials_match_allclose(self):
+        rng = np.random.default_rng(0)
+        names = [f"Material {i}" for i in range(200)]
+        matrices = np.round(rng.uniform(0, 300, [200, 6, 6]), 2)
+        densities = np.full(200, 1000)
+        indexes = (
+            MaterialIndex(names, matrices, densities),
+            MaterialIndex(names, matrices, densities, max_probes=1),
+        )
+
+        for name, matrix in zip(names, matrices):
+            C = matrix * (1 + rng.uniform(-2e-5, 2e-5, [6, 6]))
+            expected = name if np.allclose(matrix, C) else ""
+            for index in indexes:
+                assert index.find(C, 1000) == expected
+
+    def test_predefined_materials_are_found_in_few_buckets(self):
+        names = list(material.CONSTANTS)
+        matrices = [material.CONSTANTS[name].matrix for name in names]
+        densities = [material.CONSTANTS[name].density for name in names]
+        index = MaterialIndex(names, matrices, densities)
+
+        for name, matrix, density in zip(names, matrices, densities):
+            low, high = index._get_bucket_ranges(np.asarray(matrix, dtype=float))
+
+            assert np.prod(high - low + 1) <= index.max_probes
+            assert index.find(matrix, density) == name
+
+
+class TestRegistry:
+    def test_saved_registry_matches_constants(self, tmp_path):
+        registry.save(material.CONSTANTS, tmp_path)
+        loaded = registry.load(str(tmp_path))
+
+        assert list(loaded) == list(material.CONSTANTS)
+        for name, constants in material.CONSTANTS.items():
+            assert_allclose(loaded[name].matrix, constants.matrix)
+            assert loaded[name].density == constants.density
+
+    def test_materials_are_grouped_by_type(self, tmp_path, monkeypatch):
+        expected = {}
+        for name, constants in material.CONSTANTS.items():
+            material_type = material.type(symmetries.detect(constants.matrix))
+            expected.setdefault(material_type, []).append(name)
+        registry.save(material.CONSTANTS, tmp_path)
+
+        assert material.get_names_by_type() == expected
+        monkeypatch.setattr(material, "CONSTANTS", registry.load(str(tmp_path)))
+        assert material.get_names_by_type() == expected
+
+    def test_materials_of_csv_file_are_detected(self, tmp_path, monkeypatch):
+        path = tmp_path / "materials.csv"
+        path.write_text(
+            "name,rho,C11,C12,C44,C22,C33,C55,C66,C13,C23\n"
+            "Test material,1000,10,2,3,10,10,3,3,2,2\n"
+        )
+        constants = registry.load(str(path))
+        monkeypatch.setattr(material, "CONSTANTS", constants)
+
+        C = constants["Test material"].matrix
+        assert material.detect(C.tolist(), 1000) == "Test material"
+        assert material.get_names_by_type() == {"Cubic": ["Test material"]}
+
 
 class TestSymmetries:
     def test_detect_isotropic_material(self):
@@ -99,6 +176,62 @@ class TestSymmetries:
 
         assert symmetry == Material.HEXAGONAL
 
+    def test_detect_stack_of_matrices_like_each_matrix(self):
+        rng = np.random.default_rng(0)
+        C = rng.uniform(1, 100, (6, 6))
+        C = np.array([symmetries.apply(C + C.T, symmetry) for symmetry in Material])
+        stack = np.concatenate([C, np.round(C)]).reshape(2, -1, 6, 6)
+
+        symmetry = symmetries.detect(stack)
+
+        assert symmetry.shape == stack.shape[:-2]
+        assert symmetry.tolist() == [
+            [symmetries.detect(matrix) for matrix in row] for row in stack
+        ]
+
+    def test_detect_symmetry_within_tolerance(self):
+        C = Cubic(density=1, c11=100, c12=28, c44=36).matrix
+        C[0, 0] += 1e-3
+
+        assert symmetries.detect(C) == Material.ORTHORHOMBIC
+        assert symmetries.detect(C, atol=1e-2) == Material.ISOTROPIC
+
+    def test_apply_symmetry_to_stack_of_matrices_like_each_matrix(self):
+        rng = np.random.default_rng(0)
+        C = rng.uniform(1, 100, (len(Material), 6, 6))
+
+        for symmetry in Material:
+            new_matrices = symmetries.apply(C, material=symmetry)
+
+            assert_allclose(
+                new_matrices, [symmetries.apply(matrix, symmetry) for matrix in C]
+            )
+
+    def test_fold_equivalent_directions_into_same_direction(self):
+        l = np.array([0.3, -0.5, 0.8])
+        permutations = [[0, 1, 2], [1, 2, 0], [2, 0, 1], [1, 0, 2], [0, 2, 1]]
+        signs = np.array(np.meshgrid([-1, 1], [-1, 1], [-1, 1])).reshape(3, -1).T
+        equivalent = (signs[:, np.newaxis] * l[permutations]).reshape(-1, 3)
+
+        n, R = symmetries.fold(equivalent, material=Material.CUBIC)
+
+        assert_allclose(n, np.tile([0.8, 0.5, 0.3], (len(n), 1)))
+        assert_allclose(np.einsum("...ij,...j->...i", R, equivalent), n, atol=1e-12)
+        assert_allclose(
+            R @ R.swapaxes(-2, -1), np.broadcast_to(np.eye(3), R.shape), atol=1e-12
+        )
+
+    def test_fold_directions_of_hexagonal_material_into_xz_plane(self):
+        t = np.linspace(0, 2 * np.pi, 12)
+        l = np.column_stack([np.cos(t), np.sin(t), np.full_like(t, -0.5)])
+
+        n, R = symmetries.fold(l, material=Material.HEXAGONAL)
+
+        assert_allclose(n, np.tile([1, 0, 0.5], (len(n), 1)), atol=1e-12)
+        assert_allclose(
+            R @ R.swapaxes(-2, -1), np.broadcast_to(np.eye(3), R.shape), atol=1e-12
+        )
+
 
 class TestConstantsRepr:
     def test_cubic_repr_includes_class_name(self):
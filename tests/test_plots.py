@@ -0,0 +1,334 @@
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+import calculations
+import material
+import plots
+
+
+class TestPolarPlot2D:
+    def test_single_precision_curves_match_double_precision(self):
+        constants = material.CONSTANTS["Cu (copper)"]
+        C, rho = constants.matrix, constants.density
+
+        polar_plot_2d = plots.PolarPlot2D(max_level=0)  # same angles for both
+
+        expected = polar_plot_2d(C, rho)
+        retrieved = polar_plot_2d(C, rho, dtype=np.float32)
+
+        for plane in "XY", "XZ", "YZ":
+            assert_allclose(
+                retrieved["velocity"]["r"][plane],
+                expected["velocity"]["r"][plane],
+                rtol=1e-6,
+            )
+
+    def test_reduced_curves_match_full_curves(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+
+        expected = plots.PolarPlot2D(max_level=0)(C, rho)
+        retrieved = plots.PolarPlot2D(max_level=0, reduce=True)(C, rho)
+
+        for plane in "XY", "XZ", "YZ":
+            assert_allclose(
+                retrieved["velocity"]["r"][plane], expected["velocity"]["r"][plane]
+            )
+
+    def test_adaptive_curves_follow_densely_sampled_curves(self):
+        constants = material.CONSTANTS["KAP (potassium acid phthalate)"]
+        C, rho = constants.matrix, constants.density
+        polar_plot_2d = plots.PolarPlot2D()
+        dense_plot_2d = plots.PolarPlot2D(angle_samples=5000, max_level=0)
+
+        retrieved = polar_plot_2d(C, rho)
+        expected = dense_plot_2d(C, rho)
+
+        for plane in polar_plot_2d.planes:
+            t = np.array(retrieved["t"][plane])
+            c = np.array(retrieved["velocity"]["r"][plane])
+            dense_t = np.array(expected["t"][plane])
+            dense_c = np.array(expected["velocity"]["r"][plane])
+            interpolated_c = np.column_stack(
+                [
+                    np.interp(dense_t, t, c[:, mode], period=2 * np.pi)
+                    for mode in range(3)
+                ]
+            )
+
+            assert len(t) < len(dense_t) / 10
+            assert (np.diff(t) > 0).all()
+            assert_allclose(
+                interpolated_c,
+                dense_c,
+                atol=polar_plot_2d.tolerance * dense_c.max(),
+            )
+
+    def test_stacked_curves_match_curves_of_every_material(self):
+        names = "Zn (zinc)", "Cu (copper)", "KAP (potassium acid phthalate)"
+        C = np.stack([material.CONSTANTS[name].matrix for name in names])
+        rho = np.array([material.CONSTANTS[name].density for name in names])
+        polar_plot_2d = plots.PolarPlot2D(max_level=0)
+
+        retrieved = polar_plot_2d.get_stacked_arrays(C, rho)
+
+        assert len(retrieved) == len(names)
+        for data, matrix, density in zip(retrieved, C, rho):
+            expected = polar_plot_2d.get_arrays(matrix, density)
+            for plane in polar_plot_2d.planes:
+                for variable in "velocity", "slowness":
+                    assert_allclose(
+                        data[variable]["r"][plane], expected[variable]["r"][plane]
+                    )
+
+
+class TestSphericalPlot3D:
+    def test_parallel_surfaces_match_serial_surfaces(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+
+        expected = plots.SphericalPlot3D(angle_samples=20)(C, rho)
+        retrieved = plots.SphericalPlot3D(angle_samples=20, workers=2)(C, rho)
+
+        assert retrieved == expected
+
+    def test_reduced_surfaces_match_full_surfaces(self):
+        constants = material.CONSTANTS["Ti (titanium)"]
+        C, rho = constants.matrix, constants.density
+
+        expected = plots.SphericalPlot3D(angle_samples=20, reduce=False)(C, rho)
+        retrieved = plots.SphericalPlot3D(angle_samples=20)(C, rho)
+
+        for surface in "velocity", "slowness", "groupvelocity":
+            assert_allclose(
+                retrieved[surface]["vertices"],
+                expected[surface]["vertices"],
+                atol=1e-6,
+            )
+
+    def test_grid_and_foldings_are_kept_in_cache_files(self, tmp_path, monkeypatch):
+        C = material.CONSTANTS["Zn (zinc)"].matrix
+        monkeypatch.setattr(plots, "GRIDS_PATH", str(tmp_path))
+        plots._get_spherical_grid.cache_clear()
+        try:
+            built = plots.SphericalPlot3D(angle_samples=20)
+            built_folding = built._get_folding(C)
+            plots._get_spherical_grid.cache_clear()
+            read = plots.SphericalPlot3D(angle_samples=20)
+            read_folding = read._get_folding(C)
+        finally:
+            plots._get_spherical_grid.cache_clear()
+
+        assert (tmp_path / "spherical-20-faces.npy").is_file()
+        assert (tmp_path / "spherical-20-hexagonal-inverse.npy").is_file()
+        assert_allclose(read.p, built.p)
+        assert (read.faces == built.faces).all()
+        for read_array, built_array in zip(read_folding, built_folding):
+            assert_allclose(read_array, built_array)
+        assert not read.p.flags.writeable
+
+    def test_phase_surfaces_come_before_group_velocities(self, monkeypatch):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        spherical_plot_3d = plots.SphericalPlot3D(angle_samples=20)
+        get_group_velocities = calculations.ChristoffelOperator.get_group_velocities
+        calls = []
+
+        def get_and_count(self, *args, **kwargs):
+            calls.append(len(args[0]))
+            return get_group_velocities(self, *args, **kwargs)
+
+        monkeypatch.setattr(
+            calculations.ChristoffelOperator, "get_group_velocities", get_and_count
+        )
+        parts = spherical_plot_3d.iter_arrays(constants.matrix, constants.density)
+        first, second = next(parts), next(parts)
+        called = len(calls)
+        data = plots._merge([first, second, *parts])
+
+        assert (list(first), list(second), called) == (["velocity"], ["slowness"], 0)
+        assert calls == [len(spherical_plot_3d.p)]
+        assert list(data) == ["velocity", "slowness", "groupvelocity"]
+
+
+class TestIcospherePlot3D:
+    def assert_closed_mesh(self, p, faces):
+        _, face_edges = plots._get_edges(faces)
+        a, b, c = p[faces[:, 0]], p[faces[:, 1]], p[faces[:, 2]]
+        outward = np.einsum("ij,ij->i", np.cross(b - a, c - a), a + b + c)
+
+        assert (np.bincount(face_edges.ravel()) == 2).all()
+        assert (outward > 0).all()
+
+    def test_subdivided_icosahedron_is_a_closed_mesh(self):
+        p, faces = plots._get_icosphere(3)
+
+        assert len(p) == 642 and len(faces) == 1280
+        assert_allclose(np.linalg.norm(p, axis=-1), 1)
+        self.assert_closed_mesh(p, faces)
+
+    def test_icosphere_is_kept_in_cache_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(plots, "GRIDS_PATH", str(tmp_path))
+        plots._get_icosphere.cache_clear()
+        try:
+            built = plots._get_icosphere(2)
+            plots._get_icosphere.cache_clear()
+            read = plots._get_icosphere(2)
+        finally:
+            plots._get_icosphere.cache_clear()
+
+        assert (tmp_path / "icosphere-2-faces.npy").is_file()
+        assert_allclose(read[0], built[0])
+        assert (read[1] == built[1]).all()
+        assert not read[0].flags.writeable
+
+    def test_refined_mesh_is_a_closed_mesh(self):
+        constants = material.CONSTANTS["Cu (copper)"]
+        C, rho = constants.matrix, constants.density
+        icosphere_plot_3d = plots.IcospherePlot3D(subdivisions=2, max_level=2)
+
+        retrieved = icosphere_plot_3d(C, rho)
+
+        faces = np.array(retrieved["faces"]).reshape(-1, 3)
+        vertices = np.array(retrieved["velocity"]["vertices"][0]).reshape(-1, 3)
+        p = vertices / np.linalg.norm(vertices, axis=-1, keepdims=True)
+        assert len(p) > len(icosphere_plot_3d.p)
+        self.assert_closed_mesh(p, faces)
+
+    def test_refinement_solves_every_direction_once(self, monkeypatch):
+        constants = material.CONSTANTS["Cu (copper)"]
+        icosphere_plot_3d = plots.IcospherePlot3D(subdivisions=2, max_level=3)
+        evaluate = icosphere_plot_3d._evaluate
+        directions = []
+
+        def evaluate_and_keep(C, rho, p, dtype):
+            directions.append(p)
+            return evaluate(C, rho, p, dtype)
+
+        monkeypatch.setattr(icosphere_plot_3d, "_evaluate", evaluate_and_keep)
+        icosphere_plot_3d.get_arrays(constants.matrix, constants.density)
+
+        p = np.concatenate(directions)
+        assert len(directions) == 4
+        assert len(np.unique(p.round(12), axis=0)) == len(p)
+
+
+class TestResultCache:
+    def make_material(self, name="Zn (zinc)"):
+        constants = material.CONSTANTS[name]
+
+        return constants.matrix, constants.density
+
+    def test_repeated_material_is_found_in_cache(self):
+        C, rho = self.make_material()
+        cache = plots.ResultCache(plots.PolarPlot2D(max_level=0))
+
+        expected = cache(C, rho)
+        retrieved = cache(C.tolist(), rho)
+
+        assert retrieved is expected
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_configuration_of_adapter_is_part_of_key(self):
+        C, rho = self.make_material()
+        polar_plot_2d = plots.PolarPlot2D(max_level=0)
+        cache = plots.ResultCache(polar_plot_2d)
+
+        cache(C, rho)
+        polar_plot_2d.max_level = 1
+        cache(C, rho)
+
+        assert cache.misses == 2
+
+    def test_least_recently_used_results_are_evicted(self):
+        names = "Zn (zinc)", "Cu (copper)", "Ti (titanium)"
+        cache = plots.ResultCache(plots.PolarPlot2D(max_level=0), maxsize=2)
+
+        for name in names[:2] + names[:1] + names[2:] + names[:1]:
+            cache(*self.make_material(name))
+
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (2, 3)
+
+    def test_results_are_evicted_beyond_maximum_bytes(self):
+        C, rho = self.make_material("Zn (zinc)")
+        polar_plot_2d = plots.PolarPlot2D(max_level=0)
+        nbytes = len(plots.ResultCache(polar_plot_2d, format="json")(C, rho))
+        cache = plots.ResultCache(polar_plot_2d, maxbytes=int(1.5 * nbytes))
+
+        cache(C, rho)
+        cache(*self.make_material("Cu (copper)"))
+
+        assert len(cache) == 1
+        assert cache.nbytes <= cache.maxbytes
+
+    def test_serialized_results_match_results(self):
+        C, rho = self.make_material()
+        polar_plot_2d = plots.PolarPlot2D(max_level=0)
+
+        expected = plots.ResultCache(polar_plot_2d)(C, rho)
+        retrieved = plots.ResultCache(polar_plot_2d, format="json")(C, rho)
+
+        assert json.loads(retrieved) == expected
+
+    def test_parts_of_results_are_merged_into_results(self):
+        C, rho = self.make_material()
+        cache = plots.ResultCache(plots.PolarPlot2D(max_level=0), format="json")
+
+        parts = [json.loads(part) for part in cache.iter(C, rho)]
+        cached = [json.loads(part) for part in cache.iter(C, rho)]
+
+        assert len(parts) == 3
+        assert cached == [plots._merge(parts)] == [json.loads(cache(C, rho))]
+
+    def test_concurrent_calls_share_one_calculation(self):
+        C, rho = self.make_material()
+        started, release = threading.Event(), threading.Event()
+
+        class SlowPolarPlot2D(plots.PolarPlot2D):
+            def get_arrays(self, C, rho, dtype=None):
+                started.set()
+                release.wait()
+                return super().get_arrays(C, rho, dtype=dtype)
+
+        cache = plots.ResultCache(SlowPolarPlot2D(max_level=0))
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(cache, C, rho) for _ in range(4)]
+            started.wait()
+            deadline = time.monotonic() + 10
+            while cache.coalesced < 3 and time.monotonic() < deadline:
+                time.sleep(1e-3)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert all(result is results[0] for result in results)
+        assert (cache.misses, cache.coalesced) == (1, 3)
+
+    def test_waiting_calls_do_not_wait_for_parts_to_be_consumed(self):
+        C, rho = self.make_material()
+        cache = plots.ResultCache(plots.PolarPlot2D(max_level=0))
+
+        parts = cache.iter(C, rho)
+        first = next(parts)
+        with ThreadPoolExecutor(1) as executor:
+            result = executor.submit(cache, C, rho).result(timeout=10)
+
+        assert plots._merge([first, *parts]) == result
+        assert (cache.misses, len(cache)) == (1, 1)
+
+    def test_results_calculated_in_process_pool_match_results(self):
+        C, rho = self.make_material()
+        polar_plot_2d = plots.PolarPlot2D(max_level=0)
+
+        expected = plots.ResultCache(polar_plot_2d)(C, rho)
+        with ProcessPoolExecutor(1) as executor:
+            cache = plots.ResultCache(polar_plot_2d, executor=executor)
+            retrieved = cache(C, rho)
+            parts = list(cache.iter(*self.make_material("Cu (copper)")))
+
+        assert retrieved == expected
+        assert len(parts) == 1 and len(cache) == 2
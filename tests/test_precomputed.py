@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pytest
+
+import app
+import material
+import plots
+import precomputed
+import transport
+
+
+@pytest.fixture
+def constants(monkeypatch):
+    names = "Zn (zinc)", "Cu (copper)"
+    constants = {name: material.CONSTANTS[name] for name in names}
+    monkeypatch.setattr(material, "CONSTANTS", constants)
+
+    return constants
+
+
+class TestStore:
+    def test_stored_data_match_plot_data(self, constants, tmp_path):
+        precomputed.build(tmp_path)
+        store = precomputed.load(tmp_path)
+
+        for name, predefined in constants.items():
+            C, rho = predefined.matrix, predefined.density
+            curves = store.get("curves", name, C.tolist(), rho)
+            surfaces = store.get("surfaces", name, C.tolist(), rho)
+
+            assert json.loads(curves) == plots.get_velocity_curves(C, rho)
+            assert json.loads(surfaces) == plots.get_velocity_surfaces(C, rho)
+
+    def test_stored_quantized_data_match_plot_data(self, constants, tmp_path):
+        precomputed.build(tmp_path)
+        store = precomputed.load(tmp_path)
+
+        for name, predefined in constants.items():
+            C, rho = predefined.matrix, predefined.density
+            body = store.get("surfaces", name, C, rho, format="quantized")
+            expected = plots.get_velocity_surfaces(C, rho, format="quantized")
+
+            assert body == transport.encode(expected)
+
+    def test_quantized_stream_is_served_from_store(
+        self, constants, tmp_path, monkeypatch
+    ):
+        precomputed.build(tmp_path)
+        store = precomputed.load(tmp_path)
+        monkeypatch.setattr(app, "_get_store", lambda: store)
+        monkeypatch.setattr(plots, "iter_velocity_surfaces", None)
+        query = {"material": "Zn (zinc)", "format": "quantized", "stream": 1}
+
+        response = app.app.test_client().get("/plots/surfaces", query_string=query)
+
+        zinc = constants["Zn (zinc)"]
+        body = store.get(
+            "surfaces", "Zn (zinc)", zinc.matrix, zinc.density, "quantized"
+        )
+        assert response.status_code == 200
+        assert response.data == transport.get_frame(body)
+
+    def test_modified_constants_are_not_found(self, constants, tmp_path):
+        precomputed.build(tmp_path)
+        store = precomputed.load(tmp_path)
+        C = constants["Zn (zinc)"].matrix + np.eye(6)
+
+        assert store.get("curves", "Zn (zinc)", C, 7134) is None
+        assert store.get("curves", "Ti (titanium)", C, 7134) is None
+
+    def test_store_is_ignored_when_constants_change(
+        self, constants, tmp_path, monkeypatch
+    ):
+        precomputed.build(tmp_path)
+        monkeypatch.delitem(constants, "Cu (copper)")
+
+        assert precomputed.load(tmp_path) is None
+
+        precomputed.build(tmp_path)
+
+        assert precomputed.load(tmp_path) is not None
+        assert len(list(tmp_path.iterdir())) == 1
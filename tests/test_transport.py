@@ -0,0 +1,99 @@
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+import material
+import plots
+import transport
+
+
+class TestTransport:
+    def test_decoded_data_match_encoded_data(self):
+        data = {
+            "name": "test",
+            "max": 1.5,
+            "arrays": {
+                "float": np.linspace(0, 1, 15).reshape(3, 5),
+                "int": np.arange(7),
+            },
+        }
+
+        retrieved = transport.decode(transport.encode(data))
+
+        assert retrieved["name"] == "test" and retrieved["max"] == 1.5
+        assert retrieved["arrays"]["float"].dtype == np.float32
+        assert retrieved["arrays"]["int"].dtype == np.uint32
+        assert_allclose(retrieved["arrays"]["float"], data["arrays"]["float"])
+        assert_equal(retrieved["arrays"]["int"], data["arrays"]["int"])
+
+    def test_buffers_are_aligned_to_four_bytes(self):
+        data = {"a": np.arange(3), "b": np.ones((2, 3)), "label": "x"}
+
+        body = transport.encode(data)
+        length = int(np.frombuffer(body, dtype="<u4", count=1)[0])
+
+        assert length % 4 == 0
+        assert (len(body) - 4 - length) == 4 * (3 + 6)
+
+    def test_frames_of_stream_are_decoded_in_order(self):
+        parts = [{"a": np.arange(3.0)}, {"b": {"c": np.arange(5)}}, {"d": "e"}]
+
+        stream = b"".join(transport.encode_frame(part) for part in parts)
+        retrieved = list(transport.iter_frames(stream))
+
+        assert len(retrieved) == len(parts)
+        assert_equal(retrieved[0]["a"], parts[0]["a"])
+        assert_equal(retrieved[1]["b"]["c"], parts[1]["b"]["c"])
+        assert retrieved[2] == parts[2]
+
+    def test_surfaces_match_json_surfaces(self):
+        constants = material.CONSTANTS["Zn (zinc)"]
+        C, rho = constants.matrix, constants.density
+        spherical_plot_3d = plots.IcospherePlot3D(subdivisions=2)
+
+        expected = spherical_plot_3d(C, rho)
+        retrieved = transport.decode(
+            transport.encode(spherical_plot_3d.get_arrays(C, rho))
+        )
+
+        for surface in "velocity", "slowness", "groupvelocity":
+            assert retrieved[surface]["max"] == expected[surface]["max"]
+            assert_allclose(
+                retrieved[surface]["vertices"],
+                expected[surface]["vertices"],
+                rtol=1e-6,
+            )
+
+    def test_quantized_arrays_are_decoded_into_close_arrays(self):
+        array = 3 * np.sin(np.linspace(0, 10, 300)).reshape(100, 3)
+        data = {
+            "plain": transport.quantize(array, 1e-2),
+            "delta": transport.quantize(array, 1e-2, delta=True),
+        }
+
+        retrieved = transport.decode(transport.encode(data))
+
+        assert data["plain"]["$quantized"]["values"].dtype == np.int16
+        assert data["delta"]["$quantized"]["values"].dtype == np.int8
+        for key in data:
+            assert retrieved[key].dtype == np.float32
+            assert_allclose(retrieved[key], array, atol=5e-3)
+
+    def test_quantized_curves_match_curves(self):
+        constants = material.CONSTANTS["KAP (potassium acid phthalate)"]
+        C, rho = constants.matrix, constants.density
+        polar_plot_2d = plots.PolarPlot2D()
+
+        expected = polar_plot_2d.get_arrays(C, rho)
+        quantized = transport.encode(polar_plot_2d.get_quantized(C, rho))
+        retrieved = transport.decode(quantized)
+
+        assert len(quantized) < len(transport.encode(expected)) / 1.5
+        for plane in polar_plot_2d.planes:
+            assert_allclose(retrieved["t"][plane], expected["t"][plane], atol=1e-4)
+            assert_allclose(retrieved["A"][plane], expected["A"][plane], atol=1e-6)
+            for variable in "velocity", "slowness", "groupvelocity":
+                assert_allclose(
+                    retrieved[variable]["r"][plane],
+                    expected[variable]["r"][plane],
+                    atol=1e-4 * expected[variable]["max"][plane],
+                )